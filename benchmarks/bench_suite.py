@@ -0,0 +1,215 @@
+"""Benchmark every engine over cover sizes from VGA to 8K and payload sizes up to capacity.
+
+For each method (LSB, DWT, Hybrid), cover size and payload fraction of the
+method's capacity, times encode, decode and calculate_metrics (plus the
+analyst's calculate_metrics) on in-memory arrays, so file I/O does not
+blur the comparison. A second, untimed pass under tracemalloc records the
+peak memory of each operation.
+
+Results are written as JSON. With --baseline, every timing is compared to
+the stored result for the same case and the run fails (exit status 1)
+when one is slower by more than --threshold, ignoring changes smaller
+than --min-delta seconds (timer noise on sub-millisecond operations).
+
+Usage:
+    python benchmarks/bench_suite.py --sizes VGA 1080p -o results.json
+    python benchmarks/bench_suite.py --baseline results.json --threshold 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from gui.steganography.analyst import SteganographyAnalyst  # noqa: E402
+from gui.steganography.capacity import capacity  # noqa: E402
+from gui.steganography.dwt import DWTSteganography  # noqa: E402
+from gui.steganography.hybrid import HybridSteganography  # noqa: E402
+from gui.steganography.lsb import LSBSteganography  # noqa: E402
+
+SIZES = {
+    'VGA': (480, 640),
+    '720p': (720, 1280),
+    '1080p': (1080, 1920),
+    '4K': (2160, 3840),
+    '8K': (4320, 7680),
+}
+METHODS = {
+    'LSB': (LSBSteganography, ()),
+    'DWT': (DWTSteganography, ('benchmark',)),
+    'Hybrid': (HybridSteganography, ('benchmark',)),
+}
+PAYLOAD_FRACTIONS = (0.01, 0.1, 0.5, 1.0)
+OPERATIONS = ('encode', 'decode', 'calculate_metrics', 'analyst_metrics')
+
+
+def synthetic_cover(shape, seed=0):
+    """Smooth, mid-range photo-like cover
+
+    Low-frequency structure plus mild noise, kept inside 40..215 so the
+    DWT methods do not lose bits to clipping and decode can be verified.
+    """
+    rng = np.random.default_rng(seed)
+    height, width = shape
+    coarse = rng.integers(40, 216, (max(2, height // 32), max(2, width // 32), 3), dtype=np.uint8)
+    cover = cv2.resize(coarse, (width, height), interpolation=cv2.INTER_CUBIC).astype(np.int16)
+    cover += rng.integers(-3, 4, cover.shape, dtype=np.int16)
+    return np.clip(cover, 40, 215).astype(np.uint8)
+
+
+def best_of(func, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def peak_memory(func):
+    """Peak traced allocation of one call, in bytes"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_case(method, size_label, cover, fraction, repeat, measure_memory):
+    engine_class, password = METHODS[method]
+    engine = engine_class()
+    analyst = SteganographyAnalyst()
+    # Payload ngẫu nhiên: không nén được, nên đúng bằng số byte được nhúng
+    payload_size = int(capacity(cover.shape, method) * fraction)
+    payload = np.random.default_rng(1).bytes(payload_size)
+
+    calls = {
+        'encode': lambda: engine.encode_bytes(cover, payload, *password),
+    }
+    encode_time, stego = best_of(calls['encode'], repeat)
+    calls.update({
+        'decode': lambda: engine.decode_bytes(stego, *password),
+        'calculate_metrics': lambda: engine.calculate_metrics_array(cover, stego),
+        'analyst_metrics': lambda: analyst.calculate_metrics_array(cover, stego),
+    })
+    timings = {'encode': encode_time}
+    for operation in OPERATIONS[1:]:
+        timings[operation], result = best_of(calls[operation], repeat)
+        if operation == 'decode' and result != payload:
+            raise AssertionError(f"{method} {size_label} {fraction}: decoded payload differs")
+
+    results = []
+    for operation in OPERATIONS:
+        record = {
+            'method': method,
+            'size': size_label,
+            'shape': list(cover.shape),
+            'payload_fraction': fraction,
+            'payload_bytes': payload_size,
+            'operation': operation,
+            'seconds': timings[operation],
+        }
+        if measure_memory:
+            record['peak_bytes'] = peak_memory(calls[operation])
+        results.append(record)
+    return results
+
+
+def case_key(record):
+    return (record['method'], record['size'], record['payload_fraction'], record['operation'])
+
+
+def warm_up(methods):
+    """Derive the scrypt key once so the first timed DWT/Hybrid encode does not pay for it"""
+    cover = synthetic_cover((128, 128))
+    for method in methods:
+        engine_class, password = METHODS[method]
+        engine_class().encode_bytes(cover, b'', *password)
+
+
+def compare(results, baseline, threshold, min_delta):
+    """Print the change of every timing against the baseline; return regressions"""
+    previous = {case_key(record): record for record in baseline['results']}
+    regressions = []
+    for record in results:
+        old = previous.get(case_key(record))
+        if old is None:
+            continue
+        change = record['seconds'] / old['seconds'] - 1
+        flag = ''
+        if change > threshold and record['seconds'] - old['seconds'] > min_delta:
+            flag = '  REGRESSION'
+            regressions.append((record, change))
+        print(f"{record['method']:>6} {record['size']:>5} {record['payload_fraction']:>5.2f} "
+              f"{record['operation']:>17}  {old['seconds']:8.4f}s -> {record['seconds']:8.4f}s "
+              f"({change:+7.1%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=list(SIZES), choices=list(SIZES))
+    parser.add_argument('--methods', nargs='+', default=list(METHODS), choices=list(METHODS))
+    parser.add_argument('--fractions', nargs='+', type=float, default=list(PAYLOAD_FRACTIONS),
+                        help="payload sizes as fractions of each method's capacity")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per operation (best is kept)")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc pass")
+    parser.add_argument('-o', '--output', help="write results to this JSON file")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="allowed slowdown against the baseline (default 0.10 = 10%%)")
+    parser.add_argument('--min-delta', type=float, default=0.002,
+                        help="ignore slowdowns smaller than this many seconds (default 0.002)")
+    args = parser.parse_args()
+
+    warm_up(args.methods)
+    results = []
+    for size_label in args.sizes:
+        cover = synthetic_cover(SIZES[size_label])
+        for method in args.methods:
+            for fraction in args.fractions:
+                for record in bench_case(method, size_label, cover, fraction,
+                                         args.repeat, not args.no_memory):
+                    results.append(record)
+                    memory = (f"  peak={record['peak_bytes'] / 2**20:8.1f} MiB"
+                              if 'peak_bytes' in record else '')
+                    print(f"{method:>6} {size_label:>5} {fraction:>5.2f} {record['operation']:>17}  "
+                          f"{record['seconds']:8.4f}s{memory}", flush=True)
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+        if regressions:
+            print(f"{len(regressions)} case(s) slower than baseline by more than "
+                  f"{args.threshold:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,272 @@
+"""Headless command-line interface for the steganography engines.
+
+Usage (from the src directory, or with src on PYTHONPATH):
+
+    python -m cli hide covers/ --method DWT --password secret --message-file msg.txt -o out/
+    python -m cli extract "out/*.png" --method DWT --password secret
+    python -m cli hide covers/ --payload-file report.pdf -o out/
+    python -m cli extract "out/*.png" --binary -o extracted/
+    python -m cli analyze out/ --originals covers/
+    python -m cli index covers/ --db covers.sqlite
+    python -m cli select --db covers.sqlite --size 4096 --method DWT
+    python -m cli --profile spans.prom hide covers/ --message hi -o out/
+
+Inputs may be files, directories or glob patterns. One JSON object per
+input is written to stdout (or --output) as JSON Lines. Jobs run on a
+process pool (--workers); PyQt6 is never imported, and the engines are
+imported only inside the processes that run them.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+
+from gui.steganography.batch import IMAGE_EXTENSIONS, BatchExecutor, Job
+
+METHODS = ('LSB', 'DWT', 'Hybrid')
+DISTORTION_METRICS = ('mse', 'chi_square', 'histogram_difference')
+STEGO_SUFFIX = '_stego'
+PAYLOAD_SUFFIX = '.bin'
+
+
+def expand_inputs(patterns):
+    """Expand files, directories and glob patterns into a sorted list of images"""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        elif os.path.isfile(pattern):
+            matches = [pattern]
+        else:
+            matches = glob.glob(pattern, recursive=True)
+        paths.extend(path for path in matches
+                     if os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS))
+    return sorted(dict.fromkeys(paths))
+
+
+def find_original(stego_path, originals_dir):
+    """Find the cover for a stego image by file stem, ignoring the _stego suffix"""
+    stem = os.path.splitext(os.path.basename(stego_path))[0]
+    candidates = [stem]
+    if stem.endswith(STEGO_SUFFIX):
+        candidates.insert(0, stem[:-len(STEGO_SUFFIX)])
+
+    for candidate in candidates:
+        for ext in IMAGE_EXTENSIONS:
+            path = os.path.join(originals_dir, candidate + ext)
+            if os.path.isfile(path):
+                return path
+    raise ValueError(f"No original image found in {originals_dir}")
+
+
+def build_job(args, path, message):
+    """Create the batch job for one input path"""
+    if args.command == 'analyze':
+        original_path = find_original(path, args.originals)
+        return Job('calculate_metrics', 'Analyst', (original_path, path))
+
+    password = () if args.method == 'LSB' else (args.password,)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if args.command == 'extract':
+        if args.binary:
+            output_path = os.path.join(args.output_dir, f"{stem}{PAYLOAD_SUFFIX}")
+            return Job('decode_bytes', args.method, (path,) + password, output_path)
+        return Job('decode', args.method, (path,) + password)
+
+    output_path = os.path.join(args.output_dir, f"{stem}{STEGO_SUFFIX}.png")
+    operation = 'encode_bytes' if isinstance(message, bytes) else 'encode'
+    return Job(operation, args.method, (path, message) + password, output_path)
+
+
+def result_fields(args, job, value, message):
+    """Turn a job's return value into JSON record fields"""
+    if args.command == 'hide':
+        return {'output': value, 'message_size': len(message)}
+    if args.command == 'extract':
+        if value is None:
+            raise ValueError("No hidden message found")
+        if args.binary:
+            return {'output': value, 'payload_size': os.path.getsize(value)}
+        return {'message': value}
+
+    from gui.steganography.analyst import SteganographyAnalyst
+    return {
+        'original': job.args[0],
+        'metrics': value,
+        'recommendations': SteganographyAnalyst()._generate_recommendations(value),
+    }
+
+
+def read_message(args):
+    """Return the text to hide, or bytes when hiding a file with --payload-file"""
+    if args.message is not None:
+        return args.message
+    if args.payload_file is not None:
+        with open(args.payload_file, 'rb') as f:
+            return f.read()
+    with open(args.message_file, encoding='utf-8') as f:
+        return f.read()
+
+
+def run(args, out):
+    """Run a subcommand over every input; return the number of failures"""
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        print("No input images found", file=sys.stderr)
+        return 1
+
+    message = None
+    if args.command == 'hide':
+        message = read_message(args)
+    if args.command == 'hide' or getattr(args, 'binary', False):
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    # Lỗi khi tạo job (ví dụ không tìm thấy ảnh gốc) được ghi như lỗi của job
+    jobs, errors = [], {}
+    for path in paths:
+        try:
+            jobs.append(build_job(args, path, message))
+        except ValueError as e:
+            errors[path] = str(e)
+    job_paths = [path for path in paths if path not in errors]
+
+    failures = 0
+    for path, error in errors.items():
+        failures += 1
+        write_record(out, args, path, {'status': 'error', 'error': error})
+
+    executor = BatchExecutor(args.workers, args.chunksize, ordered=not args.unordered)
+    for result in executor.run(jobs):
+        fields = {'status': 'ok'}
+        error = result.error
+        if error is None:
+            try:
+                fields.update(result_fields(args, result.job, result.value, message))
+            except ValueError as e:
+                error = str(e)
+        if error is not None:
+            fields = {'status': 'error', 'error': error}
+            failures += 1
+        write_record(out, args, job_paths[result.index], fields)
+    return failures
+
+
+def write_record(out, args, path, fields):
+    record = {'input': path, 'command': args.command}
+    if args.command != 'analyze':
+        record['method'] = args.method
+    record.update(fields)
+    out.write(json.dumps(record, default=float, ensure_ascii=False) + '\n')
+    out.flush()
+
+
+def run_index(args, out):
+    """Scan cover directories into the cover index; return the number of failures"""
+    from gui.steganography.cover_index import CoverIndex
+
+    failures = 0
+    with CoverIndex(args.db) as index:
+        for directory in args.inputs:
+            counts = index.scan(directory, workers=args.workers)
+            failures += counts['failed']
+            out.write(json.dumps({'input': directory, 'command': 'index', **counts}) + '\n')
+            out.flush()
+    return failures
+
+
+def run_select(args, out):
+    """Print the least-distorting indexed cover that fits the payload"""
+    from gui.steganography.cover_index import CoverIndex
+
+    size = args.size if args.size is not None else os.path.getsize(args.payload_file)
+    with CoverIndex(args.db) as index:
+        cover = index.best_cover(size, args.method, args.metric)
+    record = {'command': 'select', 'method': args.method, 'payload_size': size}
+    if cover is None:
+        record.update(status='error', error="No indexed cover is large enough")
+    else:
+        record.update(status='ok', **cover)
+    out.write(json.dumps(record, default=float) + '\n')
+    return 0 if cover is not None else 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='cli', description="Hide, extract and analyze messages in images without the GUI")
+    parser.add_argument('-O', '--output', help="JSON Lines result file (default: stdout)")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="worker processes (default: CPU count; 1 runs in-process)")
+    parser.add_argument('--chunksize', type=int, default=1, help="images sent to a worker at once")
+    parser.add_argument('--unordered', action='store_true',
+                        help="write results as they finish instead of in input order")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="record timing spans of every engine phase and write them to FILE "
+                             "(Prometheus text for .prom/.txt, JSON otherwise)")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="with --profile, also record peak allocations (slower)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_common(sub):
+        sub.add_argument('inputs', nargs='+', help="image files, directories or glob patterns")
+        sub.add_argument('-m', '--method', choices=METHODS, default='LSB')
+        sub.add_argument('-p', '--password', help="password for DWT and Hybrid methods")
+
+    hide = subparsers.add_parser('hide', help="hide a message in every input image")
+    add_common(hide)
+    message = hide.add_mutually_exclusive_group(required=True)
+    message.add_argument('--message', help="text to hide")
+    message.add_argument('--message-file', help="UTF-8 text file to hide")
+    message.add_argument('--payload-file', help="any file to hide as binary data")
+    hide.add_argument('-o', '--output-dir', required=True, help="directory for stego PNG files")
+
+    extract = subparsers.add_parser('extract', help="extract the message from every input image")
+    add_common(extract)
+    extract.add_argument('--binary', action='store_true',
+                         help="write each payload to --output-dir instead of printing text")
+    extract.add_argument('-o', '--output-dir', help="directory for extracted payloads (--binary)")
+
+    analyze = subparsers.add_parser('analyze', help="compare stego images with their originals")
+    analyze.add_argument('inputs', nargs='+', help="stego image files, directories or glob patterns")
+    analyze.add_argument('--originals', required=True,
+                         help="directory of cover images, matched by file name")
+
+    index = subparsers.add_parser('index', help="scan cover directories into a cover index")
+    index.add_argument('inputs', nargs='+', help="cover directories")
+    index.add_argument('--db', required=True, help="index file (SQLite)")
+
+    select = subparsers.add_parser('select', help="pick the best indexed cover for a payload")
+    select.add_argument('--db', required=True, help="index file (SQLite)")
+    select.add_argument('-m', '--method', choices=METHODS, default='LSB')
+    select.add_argument('--metric', choices=DISTORTION_METRICS, default='mse',
+                        help="distortion score to minimise")
+    size = select.add_mutually_exclusive_group(required=True)
+    size.add_argument('--size', type=int, help="payload size in bytes")
+    size.add_argument('--payload-file', help="file whose size is the payload size")
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'binary', False) and not args.output_dir:
+        parser.error("--binary requires --output-dir")
+    if args.profile:
+        from gui.steganography import instrumentation
+        instrumentation.enable(trace_memory=args.profile_memory)
+
+    command = {'index': run_index, 'select': run_select}.get(args.command, run)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as out:
+            failures = command(args, out)
+    else:
+        failures = command(args, sys.stdout)
+
+    if args.profile:
+        instrumentation.write(args.profile)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,16 @@
+import importlib
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QHBoxLayout, 
                            QVBoxLayout, QPushButton, QLabel, 
                            QStackedWidget, QApplication, QFrame)
-from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtCore import Qt, QSize, QTimer
 from PyQt6.QtGui import QFont, QIcon
-from .tabs.hide_tab import HideTab
-from .tabs.extract_tab import ExtractTab
-from .tabs.analysis_tab import AnalysisTab
+
+# Các tab được import và tạo khi mở lần đầu: (module, lớp), theo thứ tự nút điều hướng
+PAGES = [
+    ('.tabs.hide_tab', 'HideTab'),
+    ('.tabs.extract_tab', 'ExtractTab'),
+    ('.tabs.analysis_tab', 'AnalysisTab'),
+]
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -134,10 +139,10 @@ class MainWindow(QMainWindow):
         # Create stacked widget for content
         self.stack = QStackedWidget()
         
-        # Add pages to stack
-        self.stack.addWidget(HideTab())
-        self.stack.addWidget(ExtractTab())
-        self.stack.addWidget(AnalysisTab())
+        # Add placeholder pages; each tab (and cv2, pywt, ...) loads on first navigation
+        self.pages = [None] * len(PAGES)
+        for _ in PAGES:
+            self.stack.addWidget(QWidget())
         content_layout.addWidget(self.stack)
         layout.addWidget(content_area)
 
@@ -148,6 +153,21 @@ class MainWindow(QMainWindow):
         # Set initial page
         self.nav_buttons[0].setProperty("Active", True)
         self.nav_buttons[0].setStyleSheet("")
+        # Trang đầu được tạo sau khi cửa sổ hiện ra
+        QTimer.singleShot(0, lambda: self.switch_page(0))
+
+    def _page(self, index):
+        """Return the tab at index, importing and building it on first use"""
+        if self.pages[index] is None:
+            module_name, class_name = PAGES[index]
+            module = importlib.import_module(module_name, __package__)
+            page = getattr(module, class_name)()
+            placeholder = self.stack.widget(index)
+            self.stack.insertWidget(index, page)
+            self.stack.removeWidget(placeholder)
+            placeholder.deleteLater()
+            self.pages[index] = page
+        return self.pages[index]
 
     def switch_page(self, index):
         # Update button styles
@@ -157,7 +177,7 @@ class MainWindow(QMainWindow):
             btn.setStyleSheet("")  # Force style refresh
         
         # Switch page
-        self.stack.setCurrentIndex(index)
+        self.stack.setCurrentWidget(self._page(index))
 
 def main():
     app = QApplication([])
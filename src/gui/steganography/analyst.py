@@ -1,93 +1,54 @@
 import cv2
 import numpy as np
-from skimage.metrics import structural_similarity as ssim
-from skimage.metrics import peak_signal_noise_ratio as psnr
+from .image_io import as_image, read_image
+from .instrumentation import span
+from .metrics import quality_metrics
 
 class SteganographyAnalyst:
     def __init__(self):
         pass
 
-    def calculate_metrics(self, original_image_path, stego_image_path):
+    def calculate_metrics(self, original_image_path, stego_image_path, progress_callback=None):
         """Tính toán các chỉ số đánh giá chất lượng"""
         # Đọc ảnh
-        original = cv2.imread(original_image_path)
-        stego = cv2.imread(stego_image_path)
+        original = read_image(original_image_path, "Could not read images")
+        stego = read_image(stego_image_path, "Could not read images")
+        return self.calculate_metrics_array(original, stego, progress_callback)
 
-        if original is None or stego is None:
-            raise ValueError("Could not read images")
+    def calculate_metrics_array(self, original, stego, progress_callback=None):
+        """Tính các chỉ số từ mảng ảnh BGR hoặc bytes ảnh đã mã hóa"""
+        original = as_image(original, "Could not read images")
+        stego = as_image(stego, "Could not read images")
 
         if original.shape != stego.shape:
             raise ValueError("Images have different dimensions")
 
-        # Chuyển sang ảnh xám để tính SSIM
-        original_gray = cv2.cvtColor(original, cv2.COLOR_BGR2GRAY)
-        stego_gray = cv2.cvtColor(stego, cv2.COLOR_BGR2GRAY)
-
-        # Tính MSE
-        mse = np.mean((original - stego) ** 2)
-
-        # Tính PSNR
-        if mse == 0:
-            psnr_value = float('inf')
-        else:
-            psnr_value = 20 * np.log10(255.0 / np.sqrt(mse))
-
-        # Tính SSIM
-        ssim_value = ssim(original_gray, stego_gray)
-
-        # Tính histogram difference
-        hist_diff = self._calculate_histogram_difference(original, stego)
-
-        # Tính chi-square test
-        chi_square = self._calculate_chi_square(original, stego)
-
-        return {
-            'psnr': psnr_value,
-            'mse': mse,
-            'ssim': ssim_value,
-            'histogram_difference': hist_diff,
-            'chi_square': chi_square
-        }
-
-    def _calculate_histogram_difference(self, original, stego):
-        """Tính sự khác biệt histogram giữa hai ảnh"""
-        hist_diff = 0
-        for channel in range(3):  # BGR channels
-            hist_orig = cv2.calcHist([original], [channel], None, [256], [0, 256])
-            hist_stego = cv2.calcHist([stego], [channel], None, [256], [0, 256])
-            hist_diff += np.sum(np.abs(hist_orig - hist_stego))
-        return hist_diff / 3  # Trung bình trên 3 kênh màu
-
-    def _calculate_chi_square(self, original, stego):
-        """Tính chi-square test giữa hai ảnh"""
-        chi_square = 0
-        for channel in range(3):
-            hist_orig = cv2.calcHist([original], [channel], None, [256], [0, 256])
-            hist_stego = cv2.calcHist([stego], [channel], None, [256], [0, 256])
-            # Tránh chia cho 0
-            hist_orig = hist_orig + 1e-10
-            chi_square += np.sum((hist_orig - hist_stego) ** 2 / hist_orig)
-        return chi_square / 3
+        # Một lần tính histogram và MSE dùng chung cho mọi chỉ số
+        return quality_metrics(original, stego, progress_callback)
 
     def analyze_noise_pattern(self, original_image_path, stego_image_path):
         """Phân tích pattern nhiễu"""
-        original = cv2.imread(original_image_path)
-        stego = cv2.imread(stego_image_path)
+        original = read_image(original_image_path, "Could not read images")
+        stego = read_image(stego_image_path, "Could not read images")
+        return self.analyze_noise_pattern_array(original, stego)
 
-        if original is None or stego is None:
-            raise ValueError("Could not read images")
+    def analyze_noise_pattern_array(self, original, stego):
+        """Phân tích pattern nhiễu từ mảng ảnh hoặc bytes ảnh"""
+        original = as_image(original, "Could not read images")
+        stego = as_image(stego, "Could not read images")
 
-        # Tính difference image
-        diff = cv2.absdiff(original, stego)
-        
-        # Tăng contrast để thấy rõ sự khác biệt
-        diff = cv2.convertScaleAbs(diff, alpha=5, beta=0)
+        with span('analyst.noise_pattern', original.nbytes):
+            # Tính difference image
+            diff = cv2.absdiff(original, stego)
 
-        # Tính histogram của ảnh difference
-        hist_diff = []
-        for channel in range(3):
-            hist = cv2.calcHist([diff], [channel], None, [256], [0, 256])
-            hist_diff.append(hist.flatten())
+            # Tăng contrast để thấy rõ sự khác biệt
+            diff = cv2.convertScaleAbs(diff, alpha=5, beta=0)
+
+            # Tính histogram của ảnh difference
+            hist_diff = []
+            for channel in range(3):
+                hist = cv2.calcHist([diff], [channel], None, [256], [0, 256])
+                hist_diff.append(hist.flatten())
 
         return {
             'difference_image': diff,
@@ -96,24 +57,36 @@ class SteganographyAnalyst:
 
     def analyze_bit_planes(self, image_path):
         """Phân tích các bit plane của ảnh"""
-        image = cv2.imread(image_path)
-        if image is None:
-            raise ValueError("Could not read image")
+        image = read_image(image_path)
+        return self.analyze_bit_planes_array(image)
+
+    def analyze_bit_planes_array(self, image):
+        """Phân tích các bit plane từ mảng ảnh hoặc bytes ảnh"""
+        image = as_image(image)
 
         bit_planes = []
-        for bit in range(8):
-            # Tạo mask cho từng bit
-            plane = np.bitwise_and(image, 2**bit)
-            plane = plane * 255 // (2**bit)  # Normalize để hiển thị
-            bit_planes.append(plane.astype(np.uint8))
+        with span('analyst.bit_planes', image.nbytes):
+            for bit in range(8):
+                # Tạo mask cho từng bit
+                plane = np.bitwise_and(image, 2**bit)
+                plane = plane * 255 // (2**bit)  # Normalize để hiển thị
+                bit_planes.append(plane.astype(np.uint8))
 
         return bit_planes
 
     def generate_report(self, original_image_path, stego_image_path):
         """Tạo báo cáo tổng hợp"""
-        metrics = self.calculate_metrics(original_image_path, stego_image_path)
-        noise_analysis = self.analyze_noise_pattern(original_image_path, stego_image_path)
-        bit_planes = self.analyze_bit_planes(stego_image_path)
+        original = read_image(original_image_path, "Could not read images")
+        stego = read_image(stego_image_path, "Could not read images")
+        return self.generate_report_array(original, stego)
+
+    def generate_report_array(self, original, stego):
+        """Tạo báo cáo tổng hợp từ mảng ảnh hoặc bytes ảnh"""
+        original = as_image(original, "Could not read images")
+        stego = as_image(stego, "Could not read images")
+        metrics = self.calculate_metrics_array(original, stego)
+        noise_analysis = self.analyze_noise_pattern_array(original, stego)
+        bit_planes = self.analyze_bit_planes_array(stego)
 
         report = {
             'metrics': metrics,
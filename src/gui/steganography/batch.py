@@ -0,0 +1,160 @@
+import importlib
+import os
+import traceback
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import instrumentation
+from .instrumentation import span
+
+# Tên phương pháp -> (module, class) trong package này
+ENGINES = {
+    'LSB': ('.lsb', 'LSBSteganography'),
+    'DWT': ('.dwt', 'DWTSteganography'),
+    'Hybrid': ('.hybrid', 'HybridSteganography'),
+    'Analyst': ('.analyst', 'SteganographyAnalyst'),
+    'CoverProfiler': ('.cover_index', 'CoverProfiler'),
+}
+# Phần mở rộng ảnh được CLI và chỉ mục ảnh phủ nhận (module này không import cv2)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+OPERATIONS = ('encode', 'decode', 'encode_bytes', 'decode_bytes', 'calculate_metrics', 'profile')
+
+# operation: một trong OPERATIONS
+# args: tham số truyền cho phương thức của engine
+# output: nếu có, ảnh stego ('encode', 'encode_bytes') hoặc payload ('decode_bytes')
+#         được ghi ra file này trong worker và giá trị trả về là đường dẫn,
+#         tránh gửi cả mảng ảnh về tiến trình chính
+Job = namedtuple('Job', ['operation', 'method', 'args', 'output'], defaults=(None,))
+
+
+class JobResult(namedtuple('JobResult', ['index', 'job', 'value', 'error'])):
+    """Outcome of one job; `error` is None on success"""
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+# Engine được tạo một lần cho mỗi tiến trình worker
+_engines = {}
+
+
+def get_engine(method):
+    """Return this process's engine instance for a method name"""
+    if method not in _engines:
+        module_name, class_name = ENGINES[method]
+        module = importlib.import_module(module_name, __package__)
+        _engines[method] = getattr(module, class_name)()
+    return _engines[method]
+
+
+def run_job(job):
+    """Run a single job in the current process"""
+    if job.operation not in OPERATIONS:
+        raise ValueError(f"Unknown operation: {job.operation}")
+
+    engine = get_engine(job.method)
+    with span(f'batch.{job.method}.{job.operation}'):
+        value = getattr(engine, job.operation)(*job.args)
+    if job.output is not None and value is not None:
+        with span('batch.write_output'):
+            if isinstance(value, bytes):
+                with open(job.output, 'wb') as f:
+                    f.write(value)
+            else:
+                import cv2
+                if not cv2.imwrite(job.output, value):
+                    raise ValueError(f"Could not write {job.output}")
+        value = job.output
+    return value
+
+
+def _run_chunk(chunk):
+    """Run (index, job) pairs, capturing each job's error instead of raising"""
+    results = []
+    for index, job in chunk:
+        try:
+            results.append(JobResult(index, job, run_job(job), None))
+        except Exception as e:
+            results.append(JobResult(index, job, None, _format_error(e)))
+    return results
+
+
+# Bộ nhớ đệm ảnh trong mỗi tiến trình worker: job hàng loạt hiếm khi đọc lại một
+# ảnh, nên mặc định tắt để mỗi worker không giữ tới 512 MiB ảnh phủ
+WORKER_CACHE_BYTES = 0
+
+
+def _init_worker(instrument, trace_memory):
+    from .image_io import image_cache
+    image_cache.configure(WORKER_CACHE_BYTES)
+    if instrument:
+        instrumentation.enable(trace_memory)
+
+
+def _run_worker_chunk(chunk):
+    """_run_chunk in a pool process; also returns the spans it recorded"""
+    if not instrumentation.is_enabled():
+        return _run_chunk(chunk), None
+    instrumentation.reset()
+    return _run_chunk(chunk), instrumentation.snapshot()
+
+
+def _format_error(error):
+    message = str(error) or traceback.format_exception_only(type(error), error)[-1].strip()
+    return f"{type(error).__name__}: {message}"
+
+
+class BatchExecutor:
+    """Fan stego jobs out over a process pool
+
+    workers: number of processes (default: os.cpu_count()); 1 runs in-process.
+    chunksize: jobs sent to a worker per task, to amortize IPC on small images.
+    ordered: yield results in job order; otherwise as soon as chunks finish.
+    """
+
+    def __init__(self, workers=None, chunksize=1, ordered=True):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = max(1, chunksize)
+        self.ordered = ordered
+
+    def _chunks(self, jobs):
+        chunk = []
+        for index, job in enumerate(jobs):
+            chunk.append((index, job))
+            if len(chunk) == self.chunksize:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def run(self, jobs):
+        """Yield a JobResult for every job; one failing job never stops the run"""
+        if self.workers == 1:
+            for chunk in self._chunks(jobs):
+                yield from _run_chunk(chunk)
+            return
+
+        # Span ghi trong tiến trình worker được gộp vào thống kê của tiến trình chính
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker,
+            initargs=(instrumentation.is_enabled(), instrumentation.memory_traced()))
+        try:
+            futures = {executor.submit(_run_worker_chunk, chunk): chunk
+                       for chunk in self._chunks(jobs)}
+            pending = futures if self.ordered else as_completed(futures)
+            for future in pending:
+                try:
+                    results, spans = future.result()
+                    if spans:
+                        instrumentation.merge(spans)
+                    yield from results
+                except Exception as e:
+                    # Worker chết (ví dụ hết bộ nhớ): báo lỗi cho cả chunk
+                    for index, job in futures[future]:
+                        yield JobResult(index, job, None, _format_error(e))
+        finally:
+            # Dừng sớm (ví dụ người gọi bỏ generator) thì hủy các chunk chưa chạy
+            executor.shutdown(cancel_futures=True)
@@ -0,0 +1,165 @@
+from collections import namedtuple
+from functools import lru_cache
+
+from .compression import max_compressed_size
+from .crypto import fernet_token_size
+from .header import CONTAINER_VERSION, FLAG_ENCRYPTED, header_size
+from .lifting import detail_shapes
+
+METHODS = ('LSB', 'DWT', 'Hybrid')
+DELIMITER = "$$END$$"  # Dấu kết thúc của định dạng LSB cũ (không header)
+
+
+# Dải chi tiết theo thứ tự của pywt.dwt2, và khóa tương ứng của pywt.wavedecn_shapes
+BANDS = ('cH', 'cV', 'cD')
+_BAND_KEYS = ('da', 'ad', 'dd')
+
+Segment = namedtuple('Segment', ['channel', 'level', 'band', 'offset', 'shape'])
+
+
+@lru_cache(maxsize=256)
+def dwt_layout(image_shape, wavelet='haar', level=1, bands=('cH',), channels=(0,),
+               transform='lifting'):
+    """Where the payload bits of a DWT embedding go, from the image shape only
+
+    Returns (segments, total): one Segment per (channel, level, band) in
+    embedding order -- channel by channel, finest level first, bands in
+    the given order -- with its bit offset and coefficient array shape,
+    and the total number of coefficients. Level 1 is the finest; the
+    defaults are the single cH band of the blue channel. transform is
+    'lifting' (integer Haar, see lifting.py) or 'float' (pywt, level 1
+    and even image dimensions only). Only the haar wavelet is supported.
+    """
+    height, width = image_shape[:2]
+    channel_count = image_shape[2] if len(image_shape) > 2 else 1
+    if not bands or len(set(bands)) != len(bands) or not set(bands) <= set(BANDS):
+        raise ValueError(f"Bands must be distinct values from {BANDS}")
+    if not channels or len(set(channels)) != len(channels):
+        raise ValueError("Channels must be distinct channel indices")
+    if any(not 0 <= channel < channel_count for channel in channels):
+        raise ValueError(f"Channels must be between 0 and {channel_count - 1}")
+    # Với wavelet dài hơn, bit nhúng bằng pywt không còn nguyên sau biến đổi ngược
+    if wavelet != 'haar':
+        raise ValueError(f"Unsupported wavelet: {wavelet} (only 'haar' is supported)")
+
+    if transform == 'lifting':
+        max_level = max(1, min(height, width).bit_length() - 1)
+    elif transform == 'float':
+        # Nhúng float ở các mức thô không giải mã lại được khi gần đầy dung lượng
+        # (sai CRC): chỉ hỗ trợ mức 1
+        if level != 1:
+            raise ValueError("The float transform supports only level 1; use the lifting transform")
+        # Kích thước lẻ: hàng/cột hệ số cuối không còn sau khi cắt ảnh khôi phục
+        if height % 2 or width % 2:
+            raise ValueError("The float transform needs even image dimensions; "
+                             "use the lifting transform")
+        import pywt
+        max_level = 1
+    else:
+        raise ValueError(f"Unknown transform: {transform}")
+    if not 1 <= level <= max_level:
+        raise ValueError(f"Unsupported decomposition level for a {width}x{height} image: {level}")
+
+    # Kích thước (cH, cV, cD) của từng mức, mức 1 trước
+    if transform == 'lifting':
+        level_shapes = detail_shapes(height, width, level)
+    else:
+        # wavedecn_shapes: [cA, mức thô nhất, ..., mức 1]
+        shapes = pywt.wavedecn_shapes((height, width), wavelet, mode='symmetric', level=level)
+        level_shapes = [tuple(shapes[-detail_level][key] for key in _BAND_KEYS)
+                        for detail_level in range(1, level + 1)]
+
+    segments = []
+    offset = 0
+    for channel in channels:
+        for detail_level in range(1, level + 1):
+            for band in bands:
+                band_index = BANDS.index(band)
+                shape = level_shapes[detail_level - 1][band_index]
+                segments.append(Segment(channel, detail_level, band_index, offset, shape))
+                offset += shape[0] * shape[1]
+    return tuple(segments), offset
+
+
+def hybrid_bits(image_shape, wavelet='haar', transform='lifting'):
+    """Number of payload bits a Hybrid embedding holds, from the image shape only
+
+    Lifting stores one bit per full 2x2 block of the blue channel (LSB of
+    its top-left pixel and parity of its cH coefficient); float stores one
+    bit per pywt cH coefficient.
+    """
+    _, total = dwt_layout(tuple(image_shape), wavelet, transform=transform)
+    if transform == 'lifting':
+        return (image_shape[0] // 2) * (image_shape[1] // 2)
+    return total
+
+
+def _max_plaintext(token_budget):
+    """Largest plaintext whose Fernet token fits in token_budget bytes, or -1"""
+    # Token: base64 của 57 + 16k byte; plaintext tối đa cho k khối là 16k - 1
+    blocks = (token_budget // 4 * 3 - 57) // 16
+    if blocks < 1:
+        return -1
+    length = 16 * blocks - 1
+    while fernet_token_size(length) > token_budget:
+        length -= 16
+    return length
+
+
+def _max_input(budget, compression):
+    """Largest payload that is guaranteed to fit in budget bytes after compression, or -1"""
+    if budget < 0:
+        return -1
+    low, high = 0, budget
+    while low < high:
+        middle = (low + high + 1) // 2
+        if max_compressed_size(compression, middle) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return low if max_compressed_size(compression, low) <= budget else 0  # Payload rỗng không bị nén
+
+
+def capacity(image_shape, method, options=None):
+    """Usable payload bytes for an image of image_shape, without reading pixels
+
+    The result is net of the container header and, for DWT and Hybrid, of
+    the Fernet token overhead. With the default 'auto' compression (which
+    never expands data) it is exact for incompressible payloads;
+    compressible ones fit more. A forced codec ('zlib', 'lzma', 'bz2')
+    reserves that codec's worst-case expansion. Returns -1 when the cover
+    cannot hold even an empty payload (the header and, for DWT and Hybrid,
+    the smallest Fernet token do not fit), so 0 always means an empty
+    payload can be encoded.
+
+    options: 'compression' (default 'auto'); for LSB, 'use_header'
+    (default True, False for the legacy delimiter format); for DWT and
+    Hybrid, 'wavelet' (only 'haar') and 'transform' (default
+    'lifting'); for DWT, also 'level' (default 1), 'bands' (default
+    ('cH',)) and 'channels' (default (0,), blue); see dwt_layout.
+    """
+    options = options or {}
+    height, width = image_shape[:2]
+    channels = image_shape[2] if len(image_shape) > 2 else 1
+    compression = options.get('compression', 'auto')
+
+    if method == 'LSB':
+        available = height * width * channels // 8
+        if not options.get('use_header', True):
+            return max(-1, available - len(DELIMITER))
+        return _max_input(available - header_size(CONTAINER_VERSION), compression)
+
+    if method in ('DWT', 'Hybrid'):
+        # Mỗi hệ số được chọn mang một bit của header + token
+        wavelet = options.get('wavelet', 'haar')
+        transform = options.get('transform', 'lifting')
+        if method == 'DWT':
+            _, coefficients = dwt_layout(tuple(image_shape), wavelet, options.get('level', 1),
+                                         tuple(options.get('bands', ('cH',))),
+                                         tuple(options.get('channels', (0,))), transform)
+        else:
+            coefficients = hybrid_bits(tuple(image_shape), wavelet, transform)
+        token_budget = coefficients // 8 - header_size(CONTAINER_VERSION, FLAG_ENCRYPTED)
+        return _max_input(_max_plaintext(token_budget), compression)
+
+    raise ValueError(f"Unknown method: {method}")
@@ -0,0 +1,146 @@
+import bz2
+import lzma
+import zlib
+
+# Mã codec được lưu trong 4 bit cao của byte flags của header
+CODEC_SHIFT = 4
+CODEC_MASK = 0xF0
+
+CODECS = {
+    'none': 0,
+    'zlib': 1,
+    'lzma': 2,
+    'bz2': 3,
+}
+CODEC_NAMES = {codec_id: name for name, codec_id in CODECS.items()}
+
+LZMA_PRESET = 6
+LZMA_MAX_DICT_SIZE = 1 << 23  # Từ điển của preset 6
+
+
+def _lzma_compress(data):
+    # Từ điển không cần lớn hơn payload: giảm ~90 MB bộ nhớ encoder cho payload nhỏ
+    dict_size = min(LZMA_MAX_DICT_SIZE, max(1 << 12, len(data)))
+    filters = [{'id': lzma.FILTER_LZMA2, 'preset': LZMA_PRESET, 'dict_size': dict_size}]
+    return lzma.compress(data, filters=filters)
+
+
+_COMPRESSORS = {
+    'zlib': lambda data: zlib.compress(data, 9),
+    'lzma': _lzma_compress,
+    'bz2': lambda data: bz2.compress(data, 9),
+}
+_DECOMPRESSORS = {
+    'zlib': zlib.decompressobj,
+    'lzma': lzma.LZMADecompressor,
+    'bz2': bz2.BZ2Decompressor,
+}
+
+# Payload LSB không được xác thực: giới hạn kích thước sau giải nén để một ảnh
+# chứa "bom nén" không thể làm cạn bộ nhớ khi giải mã
+MAX_EXPANSION = 64
+MIN_DECOMPRESSED_LIMIT = 1 << 20
+
+
+def decompressed_limit(length):
+    """Largest output decompress() accepts from `length` bytes of compressed data"""
+    return max(MIN_DECOMPRESSED_LIMIT, MAX_EXPANSION * length)
+
+
+def _within_limit(original, compressed):
+    return len(original) <= decompressed_limit(len(compressed))
+
+# Chế độ auto: thử nén một mẫu nhỏ trước; dữ liệu đã nén/mã hóa sẽ bỏ qua nén
+PROBE_SIZE = 64 * 1024
+PROBE_MIN_SAVING = 0.03
+
+
+def _looks_incompressible(data):
+    sample = data[:PROBE_SIZE]
+    return len(zlib.compress(sample, 1)) >= len(sample) * (1 - PROBE_MIN_SAVING)
+
+
+def compress(data, codec='auto'):
+    """Compress a payload; return (codec name, data)
+
+    'auto' tries every codec and keeps the smallest output, or stores the
+    data as is when no codec makes it smaller (already compressed files,
+    short text). Any other name forces that codec. Outputs that expand by
+    more than decompress() accepts are never produced: 'auto' skips them
+    and a forced codec raises ValueError.
+    """
+    if codec == 'none' or not data:
+        return 'none', data
+    if codec != 'auto':
+        if codec not in _COMPRESSORS:
+            raise ValueError(f"Unknown compression codec: {codec}")
+        compressed = _COMPRESSORS[codec](data)
+        if not _within_limit(data, compressed):
+            raise ValueError(f"Payload compresses more than {MAX_EXPANSION}x with {codec}; "
+                             f"the decoder would reject it")
+        return codec, compressed
+
+    if _looks_incompressible(data):
+        return 'none', data
+    best = ('none', data)
+    for name, compressor in _COMPRESSORS.items():
+        compressed = compressor(data)
+        if len(compressed) < len(best[1]) and _within_limit(data, compressed):
+            best = (name, compressed)
+    return best
+
+
+def decompress(data, codec):
+    """Undo compress() for a codec name
+
+    Decompresses incrementally and raises ValueError as soon as the output
+    exceeds decompressed_limit(len(data)), so a compression bomb costs at
+    most that much memory.
+    """
+    if codec == 'none':
+        return data
+    if codec not in _DECOMPRESSORS:
+        raise ValueError(f"Unknown compression codec: {codec}")
+    limit = decompressed_limit(len(data))
+    decompressor = _DECOMPRESSORS[codec]()
+    try:
+        output = decompressor.decompress(data, limit + 1)
+    except (zlib.error, lzma.LZMAError, OSError, EOFError) as e:
+        raise ValueError(f"Hidden payload could not be decompressed ({codec})") from e
+    if len(output) > limit:
+        raise ValueError(f"Hidden payload expands beyond {limit} bytes ({codec}); not decompressed")
+    if not decompressor.eof:
+        raise ValueError(f"Hidden payload could not be decompressed ({codec})")
+    return output
+
+
+def max_compressed_size(codec, length):
+    """Largest possible output of compress(data, codec) for `length` bytes of input
+
+    'auto' and 'none' never expand data. The other bounds are the worst
+    cases documented by zlib (compressBound), liblzma (LZMA2 stores
+    incompressible data in 64 KiB chunks with a 3-byte header, plus the
+    .xz framing) and libbzip2 (1% + 600 bytes).
+    """
+    if codec in ('auto', 'none'):
+        return length
+    if codec == 'zlib':
+        return length + (length >> 12) + (length >> 14) + (length >> 25) + 13
+    if codec == 'lzma':
+        return length + 3 * (length // 65536 + 1) + 128
+    if codec == 'bz2':
+        return length + length // 100 + 600
+    raise ValueError(f"Unknown compression codec: {codec}")
+
+
+def codec_flags(codec):
+    """Header flag bits recording a codec"""
+    return CODECS[codec] << CODEC_SHIFT
+
+
+def codec_from_flags(flags):
+    """Codec name recorded in header flags"""
+    codec_id = (flags & CODEC_MASK) >> CODEC_SHIFT
+    if codec_id not in CODEC_NAMES:
+        raise ValueError(f"Unsupported compression codec id: {codec_id}")
+    return CODEC_NAMES[codec_id]
@@ -0,0 +1,239 @@
+import os
+import sqlite3
+from bisect import bisect_left
+
+import cv2
+import numpy as np
+
+from .batch import IMAGE_EXTENSIONS, BatchExecutor, Job, get_engine
+from .capacity import METHODS, capacity
+
+# Điểm méo được dùng để xếp hạng ảnh phủ (giá trị nhỏ hơn là tốt hơn)
+DISTORTION_METRICS = ('mse', 'chi_square', 'histogram_difference')
+
+PROBE_FRACTION = 0.5  # Tỷ lệ dung lượng được nhúng thử khi đo độ méo
+PROBE_PASSWORD = 'cover-index-probe'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS covers (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    channels INTEGER NOT NULL,
+    noise REAL NOT NULL,
+    texture REAL NOT NULL,
+    entropy REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS method_scores (
+    path TEXT NOT NULL REFERENCES covers(path) ON DELETE CASCADE,
+    method TEXT NOT NULL,
+    capacity INTEGER NOT NULL,
+    psnr REAL,
+    mse REAL,
+    ssim REAL,
+    histogram_difference REAL,
+    chi_square REAL,
+    PRIMARY KEY (path, method)
+);
+"""
+
+
+class CoverProfiler:
+    """Measure one cover image for the index
+
+    Registered as a batch engine so a scan can fan out over processes.
+    """
+
+    def __init__(self):
+        self.probe_fraction = PROBE_FRACTION
+
+    def profile(self, image_path):
+        """Dimensions, texture/noise statistics and per-method probe scores"""
+        # Đọc trực tiếp, không qua image_cache: mỗi ảnh chỉ được đọc một lần
+        image = cv2.imread(image_path)
+        if image is None:
+            raise ValueError("Could not read image")
+
+        height, width, channels = image.shape
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        profile = {
+            'height': height,
+            'width': width,
+            'channels': channels,
+            **self._statistics(gray),
+            'methods': {},
+        }
+
+        analyst = get_engine('Analyst')
+        rng = np.random.default_rng(0)
+        for method in METHODS:
+            method_capacity = capacity(image.shape, method)
+            if method_capacity < 0:
+                continue  # Ảnh quá nhỏ cho phương pháp này
+            probe = rng.bytes(int(method_capacity * self.probe_fraction))
+            password = () if method == 'LSB' else (PROBE_PASSWORD,)
+            try:
+                stego = get_engine(method).encode_bytes(image, probe, *password)
+            except ValueError:
+                continue  # Ảnh không dùng được với phương pháp này
+            metrics = analyst.calculate_metrics_array(image, stego)
+            profile['methods'][method] = {'capacity': method_capacity, **metrics}
+        return profile
+
+    def _statistics(self, gray):
+        """Noise (high-pass residual), texture (gradient) and entropy of a grayscale image"""
+        gray = gray.astype(np.float32)
+        residual = gray - cv2.GaussianBlur(gray, (3, 3), 0)
+        gradient_x = cv2.Sobel(gray, cv2.CV_32F, 1, 0)
+        gradient_y = cv2.Sobel(gray, cv2.CV_32F, 0, 1)
+        hist = cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel()
+        p = hist[hist > 0] / hist.sum()
+        return {
+            'noise': float(residual.std()),
+            'texture': float(cv2.magnitude(gradient_x, gradient_y).mean()),
+            'entropy': float(-(p * np.log2(p)).sum()),
+        }
+
+
+class CoverIndex:
+    """Persistent index of cover images for routing payloads to carriers
+
+    Profiles live in a SQLite file. Queries run against per-(method, metric)
+    arrays sorted by capacity with a suffix minimum of the distortion, so
+    finding the least-distorting cover that fits N bytes is one bisect.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._db = sqlite3.connect(db_path)
+        self._db.execute("PRAGMA foreign_keys = ON")
+        self._db.executescript(SCHEMA)
+        self._tables = {}  # (method, metric) -> (capacities, suffix best, rows)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM covers").fetchone()[0]
+
+    def scan(self, directory, workers=None, progress_callback=None):
+        """Index new and modified images under directory; drop deleted ones
+
+        Only files whose mtime or size changed since the last scan are
+        profiled. Returns counts of added, updated, removed, unchanged and
+        failed files.
+        """
+        known = {path: (mtime_ns, size) for path, mtime_ns, size in
+                 self._db.execute("SELECT path, mtime_ns, size FROM covers")}
+        prefix = os.path.join(os.path.abspath(directory), '')
+
+        stats, changed, seen = {}, [], set()
+        for root, _, names in os.walk(directory):
+            for name in sorted(names):
+                if not name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                path = os.path.abspath(os.path.join(root, name))
+                stat = os.stat(path)
+                seen.add(path)
+                stats[path] = (stat.st_mtime_ns, stat.st_size)
+                if known.get(path) != stats[path]:
+                    changed.append(path)
+
+        removed = [path for path in known if path.startswith(prefix) and path not in seen]
+        counts = {
+            'added': 0,
+            'updated': 0,
+            'removed': len(removed),
+            'unchanged': len(seen) - len(changed),
+            'failed': 0,
+        }
+        with self._db:
+            self._db.executemany("DELETE FROM covers WHERE path = ?", [(p,) for p in removed])
+
+        jobs = [Job('profile', 'CoverProfiler', (path,)) for path in changed]
+        for done, result in enumerate(BatchExecutor(workers).run(jobs), 1):
+            path = changed[result.index]
+            if not result.ok:
+                counts['failed'] += 1
+            else:
+                counts['updated' if path in known else 'added'] += 1
+                with self._db:
+                    self._store(path, stats[path], result.value)
+            if progress_callback:
+                progress_callback(100 * done // len(jobs))
+
+        self._tables.clear()
+        return counts
+
+    def _store(self, path, stat, profile):
+        self._db.execute("DELETE FROM covers WHERE path = ?", (path,))
+        self._db.execute(
+            "INSERT INTO covers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, *stat, profile['height'], profile['width'], profile['channels'],
+             profile['noise'], profile['texture'], profile['entropy']))
+        self._db.executemany(
+            "INSERT INTO method_scores VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(path, method, scores['capacity'], scores['psnr'], scores['mse'], scores['ssim'],
+              scores['histogram_difference'], scores['chi_square'])
+             for method, scores in profile['methods'].items()])
+
+    def _table(self, method, metric):
+        """Sorted capacities, suffix-minimum row indices and rows for a method/metric"""
+        key = (method, metric)
+        if key not in self._tables:
+            rows = self._db.execute(
+                f"SELECT path, capacity, {metric} FROM method_scores "
+                f"WHERE method = ? AND {metric} IS NOT NULL ORDER BY capacity",
+                (method,)).fetchall()
+            capacities = [row[1] for row in rows]
+            # best[i]: chỉ số ảnh có độ méo nhỏ nhất trong rows[i:]
+            best = [0] * len(rows)
+            for i in range(len(rows) - 1, -1, -1):
+                if i == len(rows) - 1 or rows[i][2] < rows[best[i + 1]][2]:
+                    best[i] = i
+                else:
+                    best[i] = best[i + 1]
+            self._tables[key] = (capacities, best, rows)
+        return self._tables[key]
+
+    def best_cover(self, payload_size, method, metric='mse'):
+        """Least-distorting indexed cover that fits payload_size bytes, or None
+
+        Returns a dict with path, capacity and the distortion score.
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown method: {method}")
+        if metric not in DISTORTION_METRICS:
+            raise ValueError(f"Unknown distortion metric: {metric}")
+
+        capacities, best, rows = self._table(method, metric)
+        start = bisect_left(capacities, payload_size)
+        if start == len(rows):
+            return None
+        path, cover_capacity, score = rows[best[start]]
+        return {'path': path, 'method': method, 'capacity': cover_capacity, metric: score}
+
+    def profile(self, path):
+        """Stored statistics and per-method scores of one cover, or None"""
+        # Cursor riêng: không đổi row_factory của kết nối dùng chung
+        cursor = self._db.cursor()
+        cursor.row_factory = sqlite3.Row
+        cover = cursor.execute("SELECT * FROM covers WHERE path = ?",
+                               (os.path.abspath(path),)).fetchone()
+        if cover is None:
+            return None
+        methods = cursor.execute("SELECT * FROM method_scores WHERE path = ?",
+                                 (cover['path'],)).fetchall()
+        result = dict(cover)
+        result['methods'] = {row['method']: {k: row[k] for k in row.keys()
+                                             if k not in ('path', 'method')}
+                             for row in methods}
+        return result
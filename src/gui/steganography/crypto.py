@@ -0,0 +1,79 @@
+import base64
+import os
+import re
+from functools import lru_cache
+from hashlib import sha256
+
+# Tham số scrypt: N = 2**log_n, giá trị log_n được lưu trong header
+SCRYPT_LOG_N = 14
+SCRYPT_MIN_LOG_N = 10
+# log_n được đọc từ header không đáng tin cậy: giới hạn gần mặc định để một ảnh
+# không thể buộc mỗi lần giải mã chạy scrypt tốn ~1 GiB (2**16: ~64 MiB)
+SCRYPT_MAX_LOG_N = 16
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_SIZE = 16
+CIPHER_CACHE_SIZE = 32
+
+# Token Fernet là base64 urlsafe: byte đầu tiên ngoài bảng chữ cái là điểm kết thúc
+FERNET_TOKEN_PATTERN = re.compile(rb'[A-Za-z0-9_-]*={0,2}')
+
+_session_salt = None
+
+
+def session_salt():
+    """Return the random salt used for every encode in this process
+
+    Sharing one salt per process lets a batch that uses a single password
+    derive its key once; each token still gets its own random Fernet IV.
+    """
+    global _session_salt
+    if _session_salt is None:
+        _session_salt = os.urandom(SALT_SIZE)
+    return _session_salt
+
+
+@lru_cache(maxsize=CIPHER_CACHE_SIZE)
+def derive_cipher(password, salt, log_n=SCRYPT_LOG_N):
+    """Derive a Fernet cipher from a password with salted scrypt"""
+    # cryptography chỉ được nạp khi cần khóa lần đầu (khởi động GUI/CLI nhanh hơn)
+    from cryptography.fernet import Fernet
+    from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+    if not SCRYPT_MIN_LOG_N <= log_n <= SCRYPT_MAX_LOG_N:
+        raise ValueError(f"Unsupported scrypt cost: 2**{log_n}")
+
+    kdf = Scrypt(salt=salt, length=32, n=2 ** log_n, r=SCRYPT_R, p=SCRYPT_P)
+    key = kdf.derive(password.encode())
+    return Fernet(base64.urlsafe_b64encode(key))
+
+
+@lru_cache(maxsize=CIPHER_CACHE_SIZE)
+def legacy_cipher(password):
+    """Cipher for images written before salted keys (single SHA-256)"""
+    from cryptography.fernet import Fernet
+    key = sha256(password.encode()).digest()
+    return Fernet(base64.urlsafe_b64encode(key))
+
+
+def fernet_token_size(length):
+    """Length of the Fernet token for `length` bytes of plaintext
+
+    57 bytes of version, timestamp, IV and HMAC plus the PKCS7-padded
+    ciphertext, all base64 encoded.
+    """
+    return -(-(57 + 16 * (length // 16 + 1)) // 3) * 4
+
+
+def fernet_token_candidates(data):
+    """Yield prefixes of `data` that could be a complete Fernet token
+
+    Tokens are base64 of 57 + 16k bytes. Candidates are produced longest
+    first, which is usually the real token.
+    """
+    token_end = FERNET_TOKEN_PATTERN.match(data).end()
+    block_count = (token_end * 3 // 4 - 57) // 16
+    for blocks in range(block_count, 0, -1):
+        token_length = -(-(57 + 16 * blocks) // 3) * 4
+        if token_length <= token_end:
+            yield data[:token_length]
@@ -0,0 +1,112 @@
+import struct
+import zlib
+from collections import namedtuple
+
+# Header đặt trước payload để bộ giải mã biết chính xác số byte cần đọc
+MAGIC = b'STG'
+PREFIX_FORMAT = '>3sB'  # magic, version
+PREFIX_SIZE = struct.calcsize(PREFIX_FORMAT)
+
+# Phần còn lại của header theo từng phiên bản
+HEADER_FORMATS = {
+    1: '>I',      # payload length
+    2: '>B16sI',  # scrypt log2(N), salt, payload length
+    3: '>BII',    # flags, payload length, CRC-32 of the payload
+}
+
+# Phiên bản 3 (container nhị phân): các cờ trong byte flags
+CONTAINER_VERSION = 3
+FLAG_TEXT = 0x01       # payload là văn bản UTF-8
+FLAG_ENCRYPTED = 0x02  # payload là token Fernet, theo sau header là khối KDF
+FLAG_LIFTING = 0x04    # bit nằm trong tính chẵn lẻ của hệ số Haar số nguyên (lifting.py)
+FLAG_HYBRID = 0x08     # Hybrid lifting: mỗi bit có thêm bản sao trong LSB kênh xanh
+KDF_FORMAT = '>B16s'   # scrypt log2(N), salt
+
+Header = namedtuple('Header', ['version', 'size', 'length', 'log_n', 'salt', 'flags', 'crc'],
+                    defaults=(0, None))
+
+
+def header_size(version, flags=0):
+    """Total header size in bytes for a header version"""
+    size = PREFIX_SIZE + struct.calcsize(HEADER_FORMATS[version])
+    if version == CONTAINER_VERSION and flags & FLAG_ENCRYPTED:
+        size += struct.calcsize(KDF_FORMAT)
+    return size
+
+
+def pack_header(length, salt=None, log_n=None):
+    """Build the header that precedes a payload of `length` bytes
+
+    Passing a salt writes a version 2 header that also records the key
+    derivation parameters needed to decrypt the payload.
+    """
+    if salt is None:
+        return struct.pack(PREFIX_FORMAT, MAGIC, 1) + struct.pack(HEADER_FORMATS[1], length)
+    return (struct.pack(PREFIX_FORMAT, MAGIC, 2)
+            + struct.pack(HEADER_FORMATS[2], log_n, salt, length))
+
+
+def pack_container_header(length, crc, flags=0, salt=None, log_n=None):
+    """Build the binary container header for a payload of `length` bytes
+
+    Passing a salt marks the payload as encrypted and stores the key
+    derivation parameters after the fixed part of the header.
+    """
+    if salt is not None:
+        flags |= FLAG_ENCRYPTED
+    header = (struct.pack(PREFIX_FORMAT, MAGIC, CONTAINER_VERSION)
+              + struct.pack(HEADER_FORMATS[CONTAINER_VERSION], flags, length, crc))
+    if salt is not None:
+        header += struct.pack(KDF_FORMAT, log_n, salt)
+    return header
+
+
+def pack_container(data, flags=0, salt=None, log_n=None):
+    """Frame `data` in the binary container: header (with CRC-32) + data"""
+    return pack_container_header(len(data), zlib.crc32(data), flags, salt, log_n) + data
+
+
+def check_payload(header, data):
+    """Return data if it matches the header's CRC-32, else raise ValueError"""
+    if len(data) < header.length:
+        raise ValueError("Hidden payload is truncated")
+    if header.crc is not None and zlib.crc32(data) != header.crc:
+        raise ValueError("Hidden payload is corrupt (CRC mismatch)")
+    return data
+
+
+def read_header(read_bytes):
+    """Parse a header through read_bytes(start, count), or return None
+
+    The callback lets each engine read only the bits the header occupies.
+    """
+    prefix = read_bytes(0, PREFIX_SIZE)
+    if len(prefix) < PREFIX_SIZE or not prefix.startswith(MAGIC):
+        return None
+
+    _, version = struct.unpack(PREFIX_FORMAT, prefix)
+    if version not in HEADER_FORMATS:
+        raise ValueError(f"Unsupported header version: {version}")
+
+    body_format = HEADER_FORMATS[version]
+    body = read_bytes(PREFIX_SIZE, struct.calcsize(body_format))
+    if len(body) < struct.calcsize(body_format):
+        return None
+
+    if version == 1:
+        (length,) = struct.unpack(body_format, body)
+        return Header(version, header_size(version), length, None, None)
+
+    if version == CONTAINER_VERSION:
+        flags, length, crc = struct.unpack(body_format, body)
+        log_n = salt = None
+        if flags & FLAG_ENCRYPTED:
+            kdf_start = PREFIX_SIZE + len(body)
+            kdf = read_bytes(kdf_start, struct.calcsize(KDF_FORMAT))
+            if len(kdf) < struct.calcsize(KDF_FORMAT):
+                return None
+            log_n, salt = struct.unpack(KDF_FORMAT, kdf)
+        return Header(version, header_size(version, flags), length, log_n, salt, flags, crc)
+
+    log_n, salt, length = struct.unpack(body_format, body)
+    return Header(version, header_size(version), length, log_n, salt)
@@ -1,148 +1,356 @@
 import cv2
 import numpy as np
-import pywt
-from cryptography.fernet import Fernet
-import base64
-from hashlib import sha256
+from .capacity import capacity as payload_capacity, hybrid_bits
+from .crypto import (SCRYPT_LOG_N, derive_cipher, fernet_token_candidates,
+                     legacy_cipher, session_salt)
+from .compression import codec_flags, codec_from_flags, compress, decompress
+from .header import (CONTAINER_VERSION, FLAG_HYBRID, FLAG_LIFTING, FLAG_TEXT, check_payload,
+                     pack_container, read_header)
+from .image_io import as_image, open_image, read_image
+from .instrumentation import span
+from .mapped_image import LazyRows
+from .metrics import mse_psnr
 
 class HybridSteganography:
     def __init__(self):
         self.delimiter = "$$END$$"
         self.wavelet = 'haar'
+        # 'lifting': mỗi bit nằm cả trong LSB kênh xanh và tính chẵn lẻ của cH Haar số
+        # nguyên, hai bản sao được đối chiếu khi giải mã; 'float': DWT pywt + LSB rồi blend
+        self.transform = 'lifting'
+        self.kdf_log_n = SCRYPT_LOG_N  # Chi phí scrypt cho khóa từ mật khẩu
+        self.compression = 'auto'  # Codec nén trước khi mã hóa: 'auto', 'none', 'zlib', 'lzma', 'bz2'
 
-    def _get_key_from_password(self, password):
-        """Generate Fernet key from password"""
+    def _get_cipher(self, password, salt=None, log_n=None):
+        """Return the cached Fernet cipher for a password and salt"""
         if not password:
             raise ValueError("Password is required for Hybrid method")
-        key = sha256(password.encode()).digest()
-        return base64.urlsafe_b64encode(key)
-
-    def _encrypt_message(self, message, password):
-        """Encrypt message using Fernet encryption"""
-        key = self._get_key_from_password(password)
-        f = Fernet(key)
-        return f.encrypt(message.encode())
-
-    def _decrypt_message(self, encrypted_message, password):
-        """Decrypt message using Fernet encryption"""
-        key = self._get_key_from_password(password)
-        f = Fernet(key)
-        return f.decrypt(encrypted_message).decode()
-
-    def encode(self, image_path, message, password):
+        if salt is None:
+            return legacy_cipher(password)
+        return derive_cipher(password, salt, log_n)
+
+    def _build_payload(self, data, password, flags=0):
+        """Compress and encrypt data, then frame the token in the binary container
+
+        Compression must come first: the ciphertext is incompressible.
+        """
+        with span('hybrid.encode.compress', len(data)):
+            codec, data = compress(data, self.compression)
+        flags |= codec_flags(codec)
+        if self.transform == 'lifting':
+            flags |= FLAG_LIFTING | FLAG_HYBRID
+        salt = session_salt()
+        with span('hybrid.encode.encrypt', len(data)):
+            token = self._get_cipher(password, salt, self.kdf_log_n).encrypt(data)
+        return pack_container(token, flags, salt, self.kdf_log_n)
+
+    def _decrypt_message(self, encrypted_message, password, salt=None, log_n=None):
+        """Decrypt message; images without a salt use the legacy key"""
+        return self._get_cipher(password, salt, log_n).decrypt(encrypted_message).decode()
+
+    def encode(self, image_path, message, password, progress_callback=None):
         # Đọc ảnh
-        image = cv2.imread(image_path)
-        if image is None:
-            raise ValueError("Could not read image")
+        image = read_image(image_path)
+        return self.encode_array(image, message, password, progress_callback)
+
+    def encode_array(self, image, message, password, progress_callback=None):
+        """Hide a message in a BGR array or encoded image bytes; return the stego array"""
+        image = as_image(image)
+        if progress_callback:
+            progress_callback(10)
+
+        # Mã hóa tin nhắn (UTF-8)
+        payload = self._build_payload(message.encode('utf-8'), password, FLAG_TEXT)
+        return self._embed_payload(image, payload, progress_callback)
+
+    def encode_bytes(self, image, data, password, progress_callback=None):
+        """Hide arbitrary bytes in an image path, array or encoded bytes; return the stego array"""
+        image = as_image(image)
+        if progress_callback:
+            progress_callback(10)
+
+        payload = self._build_payload(bytes(data), password)
+        return self._embed_payload(image, payload, progress_callback)
+
+    def _embed_payload(self, image, payload, progress_callback=None):
+        """Embed a framed, encrypted payload into the blue channel"""
+        bits = np.unpackbits(np.frombuffer(payload, dtype=np.uint8))
+
+        if progress_callback:
+            progress_callback(30)
+
+        if self.transform == 'lifting':
+            return self._embed_lifting(image, bits, progress_callback)
+        return self._embed_float(image, bits, progress_callback)
+
+    def _embed_lifting(self, image, bits, progress_callback=None):
+        """Write each bit into a blue LSB and into the integer Haar cH parity of its block
+
+        Block (i, j) of the blue channel has pixels a, b in row 2i and c, d
+        below them. The bit becomes the LSB of a and the parity of
+        cH = floor((c + d) / 2) - floor((a + b) / 2), the S-transform
+        coefficient of lifting.py; when the parity is wrong, b moves by 1
+        (or 2 at 0 and 255). No other pixel changes and none leaves 0..255.
+        """
+        max_capacity = hybrid_bits(tuple(image.shape), self.wavelet, 'lifting')
+        if bits.size > max_capacity:
+            raise ValueError(f"Message too large. Maximum capacity: {max_capacity} bits")
 
-        # Mã hóa tin nhắn
-        encrypted = self._encrypt_message(message + self.delimiter, password)
-        binary_message = ''.join(format(byte, '08b') for byte in encrypted)
+        n = bits.size
+        blocks_per_row = image.shape[1] // 2
+        rows = -(-n // blocks_per_row)  # Số hàng khối chứa bit
+        stego = image.copy()
+        with span('hybrid.encode.embed', n // 8):
+            top = stego[0:2 * rows:2, :2 * blocks_per_row, 0].astype(np.int16)
+            bottom = stego[1:2 * rows:2, :2 * blocks_per_row, 0].astype(np.int16)
+            a, b = top[:, 0::2].copy(), top[:, 1::2].copy()
+            a_flat, b_flat = a.reshape(-1)[:n], b.reshape(-1)[:n]
+            lower = ((bottom[:, 0::2] + bottom[:, 1::2]) >> 1).reshape(-1)[:n]
+
+            a_flat[:] = (a_flat & ~1) | bits
+            upper = a_flat + b_flat
+            wrong = ((lower - (upper >> 1)) & 1) != bits
+            # Đổi floor((a + b) / 2) đi 1: tổng lẻ thì b + 1 (b - 2 nếu b = 255),
+            # tổng chẵn thì b - 1 (b + 2 nếu b = 0)
+            step = np.where(upper & 1, np.where(b_flat == 255, -2, 1),
+                            np.where(b_flat == 0, 2, -1))
+            b_flat += wrong * step
+
+            stego[0:2 * rows:2, 0:2 * blocks_per_row:2, 0] = a
+            stego[0:2 * rows:2, 1:2 * blocks_per_row:2, 0] = b
+
+        if progress_callback:
+            progress_callback(70)
+        return stego
+
+    def _embed_float(self, image, bits, progress_callback=None):
+        """Embed bits as signed pywt cH coefficients and blue LSBs, then blend"""
+        import pywt
+
+        # Kiểm tra wavelet, kích thước ảnh và dung lượng trước khi biến đổi
+        max_capacity = hybrid_bits(tuple(image.shape), self.wavelet, 'float')
+        if bits.size > max_capacity:
+            raise ValueError(f"Message too large. Maximum capacity: {max_capacity} bits")
 
         # Tách kênh màu
         b, g, r = cv2.split(image)
 
         # Áp dụng DWT cho kênh xanh
-        coeffs = pywt.dwt2(b.astype(float), self.wavelet)
+        with span('hybrid.encode.dwt2', b.nbytes):
+            coeffs = pywt.dwt2(b.astype(float), self.wavelet)
         cA, (cH, cV, cD) = coeffs
 
         # Nhúng tin nhắn vào cả hệ số DWT và LSB
-        msg_idx = 0
-        modified_cH = cH.copy()
-        modified_b = b.copy()
-
-        for i in range(cH.shape[0]):
-            for j in range(cH.shape[1]):
-                if msg_idx < len(binary_message):
-                    # Nhúng vào DWT
-                    if binary_message[msg_idx] == '1':
-                        modified_cH[i, j] = 50
-                    else:
-                        modified_cH[i, j] = -50
-
-                    # Nhúng vào LSB của pixel tương ứng
-                    if binary_message[msg_idx] == '1':
-                        modified_b[i*2, j*2] = modified_b[i*2, j*2] | 1
-                    else:
-                        modified_b[i*2, j*2] = modified_b[i*2, j*2] & ~1
-                    
-                    msg_idx += 1
+        n = bits.size
+        with span('hybrid.encode.embed', n // 8):
+            modified_cH = cH.copy()
+            modified_cH.reshape(-1)[:n] = np.where(bits, 50.0, -50.0)
+
+            # Hệ số (i, j) tương ứng với pixel (2i, 2j): dùng view b[::2, ::2]
+            modified_b = b.copy()
+            lsb_view = modified_b[::2, ::2]
+            rows, cols = np.unravel_index(np.arange(n), lsb_view.shape)
+            lsb_view[rows, cols] = (lsb_view[rows, cols] & 254) | bits
+
+        if progress_callback:
+            progress_callback(70)
 
         # Áp dụng IDWT
         coeffs = (cA, (modified_cH, cV, cD))
-        dwt_b = pywt.idwt2(coeffs, self.wavelet)
-        dwt_b = np.clip(dwt_b, 0, 255).astype(np.uint8)
-
-        # Kết hợp DWT và LSB
-        final_b = cv2.addWeighted(dwt_b, 0.7, modified_b, 0.3, 0)
-        
-        # Tạo ảnh stego
-        stego = cv2.merge([final_b, g, r])
+        with span('hybrid.encode.idwt2', b.nbytes):
+            dwt_b = pywt.idwt2(coeffs, self.wavelet)
+
+        with span('hybrid.encode.blend', b.nbytes):
+            dwt_b = np.clip(dwt_b, 0, 255).astype(np.uint8)
+
+            # Kết hợp DWT và LSB
+            final_b = cv2.addWeighted(dwt_b, 0.7, modified_b, 0.3, 0)
+
+            # Tạo ảnh stego
+            stego = cv2.merge([final_b, g, r])
         return stego
 
-    def decode(self, stego_image_path, password):
-        # Đọc ảnh stego
-        stego = cv2.imread(stego_image_path)
-        if stego is None:
-            raise ValueError("Could not read stego image")
-
-        # Lấy kênh xanh
-        blue = stego[:, :, 0]
-
-        # Trích xuất từ DWT
-        coeffs = pywt.dwt2(blue.astype(float), self.wavelet)
-        _, (cH, _, _) = coeffs
-
-        # Trích xuất bit từ cả DWT và LSB
-        binary_message = ''
-        for i in range(cH.shape[0]):
-            for j in range(cH.shape[1]):
-                if len(binary_message) >= 20000:
-                    break
-                
-                # Lấy bit từ DWT
-                dwt_bit = '1' if cH[i, j] > 0 else '0'
-                # Lấy bit từ LSB
-                lsb_bit = '1' if (blue[i*2, j*2] & 1) else '0'
-                
-                # Chọn bit phổ biến hơn
-                binary_message += dwt_bit if dwt_bit == lsb_bit else dwt_bit
-
-                # Thử giải mã sau mỗi 64 bit
-                if len(binary_message) % 64 == 0:
-                    try:
-                        bytes_data = bytearray()
-                        for k in range(0, len(binary_message), 8):
-                            if k + 8 <= len(binary_message):
-                                bytes_data.append(int(binary_message[k:k+8], 2))
-                        
-                        decrypted = self._decrypt_message(bytes(bytes_data), password)
-                        if self.delimiter in decrypted:
-                            return decrypted[:decrypted.index(self.delimiter)]
-                    except:
-                        continue
-
-        raise ValueError("No valid message found or incorrect password")
+    def decode(self, stego_image_path, password, progress_callback=None):
+        # Đọc ảnh stego (BMP/.npy được ánh xạ bộ nhớ, chỉ đọc các hàng cần thiết)
+        stego = open_image(stego_image_path, "Could not read stego image")
+        return self.decode_array(stego, password, progress_callback)
 
-    def calculate_metrics(self, original_image_path, stego_image_path):
-        original = cv2.imread(original_image_path)
-        stego = cv2.imread(stego_image_path)
+    def decode_array(self, stego, password, progress_callback=None):
+        """Extract the message from a stego image array or encoded image bytes"""
+        data, encoding = self._extract(stego, password, progress_callback)
+        if encoding is None:
+            raise ValueError("Hidden payload is binary data; use decode_bytes")
+        return data.decode(encoding)
 
-        if original is None or stego is None:
-            raise ValueError("Could not read images")
+    def decode_bytes(self, stego, password, progress_callback=None):
+        """Extract the hidden payload as bytes from an image path, array or encoded bytes"""
+        data, _ = self._extract(stego, password, progress_callback)
+        return data
 
+    def _extract(self, stego, password, progress_callback=None):
+        """Return (payload bytes, text encoding or None for binary data)"""
+        from cryptography.fernet import InvalidToken
+        stego = as_image(stego, "Could not read stego image")
+        if progress_callback:
+            progress_callback(20)
+
+        if self.wavelet != 'haar':
+            raise ValueError(f"Unsupported wavelet: {self.wavelet} (only 'haar' is supported)")
+
+        # Ảnh lifting: header nằm trong LSB và tính chẵn lẻ cH của các khối kênh xanh
+        cH_flat = self._lifting_blocks(stego[:, :, 0])
+        read_bytes = self._read_lifting_bytes
+
+        def probe(start, count):
+            try:
+                return read_bytes(cH_flat, start, count)
+            except ValueError:
+                return b''  # Hai bản sao khác nhau: không phải ảnh Hybrid lifting
+
+        with span('hybrid.decode.header'):
+            header = read_header(probe)
+        if (header is None or header.version != CONTAINER_VERSION
+                or header.flags & (FLAG_LIFTING | FLAG_HYBRID) != FLAG_LIFTING | FLAG_HYBRID):
+            # Trích xuất từ DWT của kênh xanh
+            # Chỉ dùng bit DWT: LSB của b[::2, ::2] bị addWeighted làm sai lệch
+            # khi tạo ảnh stego, và bộ giải mã cũ cũng luôn chọn bit DWT
+            cH_flat = self._horizontal_detail(stego[:, :, 0])
+            read_bytes = self._read_bytes
+            with span('hybrid.decode.header'):
+                header = read_header(lambda start, count: read_bytes(cH_flat, start, count))
+        if progress_callback:
+            progress_callback(50)
+
+        # Ảnh có header: đọc đúng số byte của token và giải mã một lần
+        if header is not None and header.version == CONTAINER_VERSION:
+            with span('hybrid.decode.payload', header.length):
+                token = read_bytes(cH_flat, header.size, header.length)
+            token = check_payload(header, token)
+            if progress_callback:
+                progress_callback(60)
+
+            # Dẫn xuất khóa và giải mã là các bước chậm nhất: báo tiến độ trước và sau
+            # mỗi bước để lệnh hủy của StegoWorker có hiệu lực
+            with span('hybrid.decode.kdf'):
+                cipher = self._get_cipher(password, header.salt, header.log_n)
+            if progress_callback:
+                progress_callback(75)
+            try:
+                with span('hybrid.decode.decrypt', len(token)):
+                    data = cipher.decrypt(token)
+            except InvalidToken:
+                raise ValueError("No valid message found or incorrect password")
+            if progress_callback:
+                progress_callback(90)
+            with span('hybrid.decode.decompress', len(data)):
+                data = decompress(data, codec_from_flags(header.flags))
+            if progress_callback:
+                progress_callback(100)
+            return data, 'utf-8' if header.flags & FLAG_TEXT else None
+
+        if header is not None:
+            token = self._read_bytes(cH_flat, header.size, header.length)
+            if progress_callback:
+                progress_callback(60)
+            message = self._try_decrypt(token, password, header.salt, header.log_n)
+        else:
+            with span('hybrid.decode.legacy'):
+                message = self._decode_legacy(cH_flat, password, progress_callback)
+
+        if message is None:
+            raise ValueError("No valid message found or incorrect password")
+        return message.encode('utf-8'), 'utf-8'
+
+    def _lifting_blocks(self, blue):
+        """Per full 2x2 block of the blue channel: LSB of its top-left pixel + 2 * cH parity
+
+        0 and 3 mean both copies hold the same bit. Computed only for the
+        block rows that are read, like _horizontal_detail.
+        """
+        def load_rows(first, last):
+            pixels = np.asarray(blue[2 * first:2 * last, :2 * width], dtype=np.int16)
+            upper = (pixels[0::2, 0::2] + pixels[0::2, 1::2]) >> 1
+            lower = (pixels[1::2, 0::2] + pixels[1::2, 1::2]) >> 1
+            return (pixels[0::2, 0::2] & 1) | (((lower - upper) & 1) << 1)
+
+        height, width = blue.shape[0] // 2, blue.shape[1] // 2
+        return LazyRows(height, width, load_rows, np.int16)
+
+    def _read_lifting_bytes(self, blocks, start, count):
+        """Read `count` bytes from byte `start`; ValueError if the LSB and cH copies differ"""
+        selected = blocks[start * 8:(start + count) * 8]
+        selected = selected[:selected.size - selected.size % 8]
+        if np.any((selected == 1) | (selected == 2)):
+            raise ValueError("Hidden payload is corrupt (LSB and DWT copies differ)")
+        return np.packbits(selected & 1).tobytes()
+
+    def _horizontal_detail(self, blue):
+        """Flat cH of the blue channel, computed only for the rows that are read
+
+        Haar coefficient row i depends on image rows 2i and 2i+1 only, so
+        cH rows can be produced band by band; for a memory-mapped image a
+        short message never touches the rest of the file.
+        """
+        import pywt
+
+        def load_rows(first, last):
+            rows = blue[2 * first:2 * last]
+            with span('hybrid.decode.dwt2', rows.nbytes):
+                _, (cH, _, _) = pywt.dwt2(rows.astype(float), self.wavelet)
+            return cH
+
+        height, width = blue.shape
+        return LazyRows((height + 1) // 2, (width + 1) // 2, load_rows, np.float64)
+
+    def _read_bytes(self, cH_flat, start, count):
+        """Read `count` bytes from the sign of cH starting at byte `start`"""
+        coefficients = cH_flat[start * 8:(start + count) * 8]
+        usable = coefficients.size - coefficients.size % 8
+        return np.packbits(coefficients[:usable] > 0).tobytes()
+
+    def _try_decrypt(self, token, password, salt=None, log_n=None):
+        """Decrypt a token and strip the delimiter, or return None"""
+        from cryptography.fernet import InvalidToken
+        try:
+            decrypted = self._decrypt_message(token, password, salt, log_n)
+        except (InvalidToken, UnicodeDecodeError):
+            return None
+        if self.delimiter not in decrypted:
+            return None
+        return decrypted[:decrypted.index(self.delimiter)]
+
+    def _decode_legacy(self, cH_flat, password, progress_callback=None):
+        """Decode images written before the length header existed"""
+        data = self._read_bytes(cH_flat, 0, cH_flat.size // 8)
+        for token in fernet_token_candidates(data):
+            if progress_callback:
+                progress_callback(60)
+            message = self._try_decrypt(token, password)
+            if message is not None:
+                return message
+        return None
+
+    def calculate_metrics(self, original_image_path, stego_image_path):
+        original = read_image(original_image_path, "Could not read images")
+        stego = read_image(stego_image_path, "Could not read images")
+        return self.calculate_metrics_array(original, stego)
+
+    def calculate_metrics_array(self, original, stego):
+        """Calculate PSNR, MSE and capacity from original and stego arrays"""
+        original = as_image(original, "Could not read images")
+        stego = as_image(stego, "Could not read images")
         if original.shape != stego.shape:
             raise ValueError("Images have different dimensions")
 
-        mse = np.mean((original - stego) ** 2)
-        if mse == 0:
-            psnr = float('inf')
-        else:
-            psnr = 20 * np.log10(255.0 / np.sqrt(mse))
+        with span('hybrid.metrics.mse_psnr', original.nbytes):
+            mse, psnr = mse_psnr(original, stego)
 
-        # Tính dung lượng
-        height, width = original.shape[:2]
-        capacity = (height * width) // 16  # Dung lượng cho hybrid
+        # Tính dung lượng từ kích thước ảnh: một bit trên mỗi hệ số cH
+        capacity = payload_capacity(original.shape, 'Hybrid', {
+            'compression': self.compression,
+            'wavelet': self.wavelet,
+            'transform': self.transform,
+        })
 
         return {
             'psnr': psnr,
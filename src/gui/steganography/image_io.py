@@ -0,0 +1,149 @@
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from .instrumentation import span
+from .mapped_image import is_mappable, open_mapped
+
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+
+class ImageCache:
+    """Process-wide LRU cache of decoded images
+
+    Entries are keyed by (path, mtime, size), so an edited file is decoded
+    again. Cached arrays are read-only because every caller shares them;
+    callers that modify pixels must copy first (the engines already do).
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> image
+        self._keys_by_path = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """Return the decoded image for `path`, or None if it cannot be read"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        path = os.path.abspath(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return image
+            self.misses += 1
+
+        with span('image_io.imread', stat.st_size):
+            image = cv2.imread(path)
+        if image is None:
+            return None
+        image.flags.writeable = False
+
+        with self._lock:
+            old_key = self._keys_by_path.get(path)
+            if old_key is not None:
+                self._remove(old_key)
+            if image.nbytes <= self.max_bytes:
+                self._entries[key] = image
+                self._keys_by_path[path] = key
+                self._size += image.nbytes
+                self._evict()
+        return image
+
+    def configure(self, max_bytes):
+        """Change the memory cap, evicting least recently used images if needed"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_path.clear()
+            self._size = 0
+
+    @property
+    def size(self):
+        """Bytes of pixel data currently cached"""
+        return self._size
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        image = self._entries.pop(key, None)
+        if image is not None:
+            self._size -= image.nbytes
+            del self._keys_by_path[key[0]]
+
+
+image_cache = ImageCache()
+
+
+def read_image(path, error="Could not read image"):
+    """Decode an image file into a BGR array, through the shared image cache"""
+    image = image_cache.get(path)
+    if image is None:
+        raise ValueError(error)
+    return image
+
+
+def open_image(path, error="Could not read image"):
+    """Memory-map uncompressed BMP/.npy images, decode everything else via the cache
+
+    Mapped pixels are only read from disk when indexed, so decoders that
+    need a short prefix of the image do not pay for the whole file.
+    """
+    if is_mappable(path):
+        try:
+            return open_mapped(path)
+        except (ValueError, OSError) as e:
+            if str(path).lower().endswith('.npy'):
+                # OpenCV không đọc được .npy: báo lý do thay vì lỗi chung chung
+                raise ValueError(f"{error}: {e}") from e
+            # Ví dụ BMP 8-bit hoặc nén RLE: để OpenCV giải mã
+    return read_image(path, error)
+
+
+def as_image(image, error="Could not read image"):
+    """Return a BGR array from an ndarray, an image path or encoded image bytes (PNG, BMP, ...)
+
+    Arrays must already be uint8 BGR of shape (rows, cols, 3); grayscale,
+    BGRA or float arrays raise ValueError instead of failing inside an engine.
+    """
+    if isinstance(image, np.ndarray):
+        if image.dtype != np.uint8 or image.ndim != 3 or image.shape[2] != 3:
+            raise ValueError(f"{error}: expected a uint8 BGR array of shape (rows, cols, 3), "
+                             f"got {image.dtype} {image.shape}")
+        return image
+    if isinstance(image, (str, os.PathLike)):
+        return open_image(image, error)
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        with span('image_io.imdecode', len(image)):
+            decoded = cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if decoded is None:
+            raise ValueError(error)
+        return decoded
+    raise TypeError("Expected an image array, path or encoded image bytes")
+
+
+def encode_image(image, ext='.png'):
+    """Encode a BGR array to image file bytes, e.g. to return from a service"""
+    with span('image_io.imencode', image.nbytes):
+        ok, buffer = cv2.imencode(ext, image)
+    if not ok:
+        raise ValueError(f"Could not encode image as {ext}")
+    return buffer.tobytes()
@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+_enabled = False
+_trace_memory = False
+_stats = {}  # tên span -> [count, seconds, bytes, peak_bytes]
+_lock = threading.Lock()
+_local = threading.local()
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'nbytes', 'start', 'base_memory', 'child_peak')
+
+    def __init__(self, name, nbytes):
+        self.name = name
+        self.nbytes = nbytes
+
+    def __enter__(self):
+        if _trace_memory:
+            # Span lồng nhau: reset_peak của span con sẽ xóa đỉnh của span cha,
+            # nên đỉnh của span con được cộng dồn lại cho span cha khi kết thúc
+            stack = getattr(_local, 'stack', None)
+            if stack is None:
+                stack = _local.stack = []
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].child_peak = max(stack[-1].child_peak, peak)
+            tracemalloc.reset_peak()
+            self.base_memory = current
+            self.child_peak = 0
+            stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        peak = 0
+        if _trace_memory:
+            _local.stack.pop()
+            absolute_peak = max(tracemalloc.get_traced_memory()[1], self.child_peak)
+            peak = absolute_peak - self.base_memory
+            if _local.stack:
+                parent = _local.stack[-1]
+                parent.child_peak = max(parent.child_peak, absolute_peak)
+        with _lock:
+            stats = _stats.get(self.name)
+            if stats is None:
+                stats = _stats[self.name] = [0, 0.0, 0, 0]
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] += self.nbytes
+            stats[3] = max(stats[3], peak)
+        return False
+
+
+def span(name, nbytes=0):
+    """Context manager timing one phase; nbytes is the amount of data it processed
+
+    While instrumentation is disabled this returns a shared no-op context
+    manager, so an instrumented phase costs one flag check.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, nbytes)
+
+
+def enable(trace_memory=False):
+    """Start recording call count, wall time and bytes processed per span name
+
+    trace_memory also records, through tracemalloc, each span's peak
+    allocation above the memory in use when it started (slower). Setting
+    STEGO_INSTRUMENT=1 (or =memory) in the environment enables recording
+    at import time, including in batch worker processes.
+    """
+    global _enabled, _trace_memory
+    _trace_memory = trace_memory
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _enabled = True
+
+
+def disable():
+    global _enabled, _trace_memory
+    _enabled = False
+    _trace_memory = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def memory_traced():
+    return _trace_memory
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def snapshot():
+    """Recorded statistics: {span name: {count, seconds, bytes, peak_bytes}}"""
+    with _lock:
+        return {name: {'count': count, 'seconds': seconds, 'bytes': nbytes, 'peak_bytes': peak}
+                for name, (count, seconds, nbytes, peak) in sorted(_stats.items())}
+
+
+def merge(other):
+    """Add statistics from another snapshot (e.g. returned by a worker process)"""
+    with _lock:
+        for name, values in other.items():
+            stats = _stats.get(name)
+            if stats is None:
+                stats = _stats[name] = [0, 0.0, 0, 0]
+            stats[0] += values['count']
+            stats[1] += values['seconds']
+            stats[2] += values['bytes']
+            stats[3] = max(stats[3], values['peak_bytes'])
+
+
+def to_json(indent=2):
+    return json.dumps(snapshot(), indent=indent)
+
+
+def to_prometheus(prefix='stego'):
+    """Statistics in the Prometheus text exposition format"""
+    metrics = (
+        ('span_calls_total', 'counter', 'Number of times the span ran', 'count'),
+        ('span_seconds_total', 'counter', 'Wall time spent in the span', 'seconds'),
+        ('span_bytes_total', 'counter', 'Bytes processed by the span', 'bytes'),
+        ('span_peak_bytes', 'gauge', 'Largest allocation peak observed in the span', 'peak_bytes'),
+    )
+    stats = snapshot()
+    lines = []
+    for suffix, kind, help_text, field in metrics:
+        name = f"{prefix}_{suffix}"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for span_name, values in stats.items():
+            label = span_name.replace('\\', '\\\\').replace('"', '\\"')
+            lines.append(f'{name}{{span="{label}"}} {values[field]}')
+    return '\n'.join(lines) + '\n'
+
+
+def write(path):
+    """Write the statistics to path: Prometheus text for .prom/.txt, JSON otherwise"""
+    text = to_prometheus() if path.endswith(('.prom', '.txt')) else to_json()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+if os.environ.get('STEGO_INSTRUMENT'):
+    enable(trace_memory=os.environ['STEGO_INSTRUMENT'].lower() == 'memory')
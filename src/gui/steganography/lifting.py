@@ -0,0 +1,134 @@
+import numpy as np
+
+from .mapped_image import LazyRows
+
+# Biến đổi Haar số nguyên bằng lifting (S-transform): d = b - a, s = a + floor(d / 2).
+# Không mất mát trên int16, nên bit nhúng vào hệ số được giữ nguyên chính xác.
+# Hệ số được trả về theo định dạng của pywt.wavedec2: [cA, (cH, cV, cD) thô nhất, ..., mức 1]
+
+
+def _lift(x):
+    """One lifting step along axis 0: (approximation, detail)
+
+    With an odd length the last sample has no partner and passes to the
+    approximation unchanged.
+    """
+    even, odd = x[0::2], x[1::2]
+    pairs = odd.shape[0]
+    detail = odd - even[:pairs]
+    approx = even.copy()
+    approx[:pairs] += detail >> 1
+    return approx, detail
+
+
+def _unlift(approx, detail):
+    """Undo _lift"""
+    pairs = detail.shape[0]
+    out = np.empty((approx.shape[0] + pairs,) + approx.shape[1:], dtype=approx.dtype)
+    even = out[0::2]
+    even[...] = approx
+    even[:pairs] -= detail >> 1
+    out[1::2] = even[:pairs] + detail
+    return out
+
+
+def _forward2(x):
+    low, high = _lift(x.T)  # Theo trục 1 (cột)
+    cA, cH = _lift(low.T)
+    cV, cD = _lift(high.T)
+    return cA, tuple(np.ascontiguousarray(band) for band in (cH, cV, cD))
+
+
+def _inverse2(cA, details):
+    cH, cV, cD = details
+    low = _unlift(cA, cH)
+    high = _unlift(cV, cD)
+    return _unlift(low.T, high.T).T
+
+
+def haar_forward(channel, level=1):
+    """Integer Haar decomposition of a 2-D array, laid out like pywt.wavedec2
+
+    The input is converted to int16; for 8-bit images every coefficient
+    fits (details grow to at most +-510).
+    """
+    approx = np.asarray(channel, dtype=np.int16)
+    details = []
+    for _ in range(level):
+        approx, level_details = _forward2(approx)
+        details.insert(0, level_details)
+    return [approx] + details
+
+
+def haar_inverse(coeffs):
+    """Exact inverse of haar_forward; returns an int16 array"""
+    approx = coeffs[0]
+    for details in coeffs[1:]:
+        approx = _inverse2(approx, details)
+    return approx
+
+
+def detail_shapes(height, width, level=1):
+    """(cH, cV, cD) shapes of every level, finest first, from the image shape only"""
+    shapes = []
+    for _ in range(level):
+        half_height, half_width = height // 2, width // 2
+        rest_height, rest_width = height - half_height, width - half_width
+        shapes.append(((half_height, rest_width), (rest_height, half_width),
+                       (half_height, half_width)))
+        height, width = rest_height, rest_width
+    return shapes
+
+
+def clamp_margin(level, bands):
+    """How far changing coefficient parities can move a pixel
+
+    Per level, a cH parity change moves a pixel by at most 1, and changes
+    to cV and cD together by at most 1 more; coarser levels add up. A
+    cover clamped to [margin, 255 - margin] therefore never overflows.
+    """
+    per_level = ('cH' in bands) + bool({'cV', 'cD'} & set(bands))
+    return level * per_level
+
+
+def clamp_used_blocks(plane, level, band_width, count, margin):
+    """Clamp, in place, the pixels the first `count` coefficients of a band depend on
+
+    Coefficient (i, j) of a level-`level` band comes from the 2**level
+    square pixel block at (i, j) only, so pixels outside the blocks that
+    carry bits keep their values.
+    """
+    size = 1 << level
+    rows, rest = divmod(count, band_width)
+    for block in (plane[:rows * size, :band_width * size],
+                  plane[rows * size:(rows + 1) * size, :rest * size]):
+        np.clip(block, margin, 255 - margin, out=block)
+
+
+def to_uint8(channel):
+    """haar_inverse output as uint8; raises ValueError if a pixel left 0..255"""
+    if channel.min() < 0 or channel.max() > 255:
+        raise ValueError("Embedding moved pixels outside the 0..255 range")
+    return channel.astype(np.uint8)
+
+
+def lazy_detail(channel, band):
+    """Flat level-1 detail band of a channel, computed only for the rows that are read
+
+    Coefficient row i depends on image rows 2i and 2i+1 only, so a short
+    message in a memory-mapped image never touches the rest of the file.
+    """
+    def load_rows(first, last):
+        _, details = _forward2(np.asarray(channel[2 * first:2 * last], dtype=np.int16))
+        return details[band]
+
+    height, width = channel.shape[:2]
+    rows, row_size = detail_shapes(height, width)[0][band]
+    return LazyRows(rows, row_size, load_rows, np.int16)
+
+
+def read_parity_bytes(coefficients, start, count):
+    """Bytes stored in the parities of `count` * 8 coefficients from byte `start`"""
+    selected = coefficients[start * 8:(start + count) * 8]
+    usable = selected.size - selected.size % 8
+    return np.packbits(selected[:usable] & 1).tobytes()
@@ -1,9 +1,21 @@
-import cv2
+import os
+import zlib
 import numpy as np
+from .capacity import capacity as payload_capacity
+from .compression import codec_flags, codec_from_flags, compress, decompress
+from .header import (CONTAINER_VERSION, FLAG_TEXT, check_payload, header_size,
+                     pack_container, pack_container_header, read_header)
+from .image_io import as_image, open_image, read_image
+from .instrumentation import span
+from .mapped_image import create_mapped_like, flat_pixels, flush, is_mappable, open_mapped
+from .metrics import mse_psnr
 
 class LSBSteganography:
     def __init__(self):
         self.delimiter = "$$END$$"
+        self.scan_chunk_bytes = 1 << 20  # Message bytes unpacked per step when searching the delimiter
+        self.stream_band_bytes = 16 << 20  # Pixel bytes held in memory per band by encode_stream
+        self.compression = 'auto'  # Codec nén payload: 'auto', 'none', 'zlib', 'lzma' hoặc 'bz2'
 
     def text_to_binary(self, text):
         """Convert text to binary string"""
@@ -22,87 +34,281 @@ class LSBSteganography:
                 return text[:-len(self.delimiter)]
         return text
 
-    def can_encode(self, image, message):
-        """Check if the message can fit in the image"""
-        max_bytes = (image.shape[0] * image.shape[1] * image.shape[2]) // 8
-        message_size = len(message + self.delimiter)
-        return message_size <= max_bytes
+    def _message_to_bytes(self, text):
+        """Convert text to one byte per character"""
+        try:
+            return text.encode('latin-1')
+        except UnicodeEncodeError:
+            raise ValueError("LSB method only supports Latin-1 characters without a header")
 
-    def encode(self, image_path, message):
-        """Hide message in image using LSB steganography"""
-        image = cv2.imread(image_path)
-        if image is None:
-            raise ValueError("Could not read image")
+    def _build_payload(self, message, use_header):
+        """Frame the message in the binary container or with the text delimiter"""
+        if use_header:
+            return self._pack(message.encode('utf-8'), FLAG_TEXT)
+        return self._message_to_bytes(message + self.delimiter)
+
+    def _pack(self, data, flags=0):
+        """Compress data with self.compression and frame it in the container"""
+        with span('lsb.encode.compress', len(data)):
+            codec, data = compress(data, self.compression)
+        return pack_container(data, flags | codec_flags(codec))
+
+    def _capacity_bytes(self, image):
+        return (image.shape[0] * image.shape[1] * image.shape[2]) // 8
+
+    def can_encode(self, image, message, use_header=True):
+        """Check if the message, after compression and framing, can fit in the image"""
+        return len(self._build_payload(message, use_header)) <= self._capacity_bytes(image)
+
+    def encode(self, image_path, message, use_header=True, progress_callback=None):
+        """Hide message in image using LSB steganography
+
+        By default the message is stored as UTF-8 in the binary container
+        (length, flags and CRC-32), so decoding only reads the bits that
+        belong to the message. use_header=False writes the legacy Latin-1
+        text terminated by the delimiter. progress_callback, if given, is
+        called with a percentage as each phase completes.
+        """
+        image = read_image(image_path)
+        return self.encode_array(image, message, use_header, progress_callback)
+
+    def encode_array(self, image, message, use_header=True, progress_callback=None):
+        """Hide message in a BGR array or encoded image bytes; return the stego array"""
+        image = as_image(image)
 
         # Check if message can fit in image
-        if not self.can_encode(image, message):
+        payload = self._build_payload(message, use_header)
+        if len(payload) > self._capacity_bytes(image):
+            raise ValueError("Message too large for image")
+        return self._embed(image, payload, progress_callback)
+
+    def encode_bytes(self, image, data, progress_callback=None):
+        """Hide arbitrary bytes (e.g. a file's content) in an image; return the stego array
+
+        image may be a path, a BGR array or encoded image bytes. The data is
+        compressed first according to self.compression.
+        """
+        image = as_image(image)
+        payload = self._pack(bytes(data))
+        if len(payload) > self._capacity_bytes(image):
             raise ValueError("Message too large for image")
+        return self._embed(image, payload, progress_callback)
 
-        # Convert message to binary
-        binary_message = ''.join(format(ord(char), '08b') for char in message + self.delimiter)
-        message_length = len(binary_message)
+    def _embed(self, image, payload, progress_callback=None):
+        """Write the framed payload into the LSBs of a copy of image"""
+        if progress_callback:
+            progress_callback(30)
 
-        # Flatten the image array
-        stego_image = image.copy()
-        stego_flat = stego_image.flatten()
+        # Convert payload to a bit array (one uint8 0/1 per bit, MSB first)
+        bits = np.unpackbits(np.frombuffer(payload, dtype=np.uint8))
+        if progress_callback:
+            progress_callback(50)
 
-        # Hide message in LSB
-        for i in range(message_length):
-            stego_flat[i] = (stego_flat[i] & 254) | int(binary_message[i])
+        # Hide message in LSB with a single masked assignment on the flat view
+        with span('lsb.encode.embed', image.nbytes):
+            stego_image = image.copy()
+            stego_flat = stego_image.reshape(-1)
+            stego_flat[:bits.size] = (stego_flat[:bits.size] & 254) | bits
+        if progress_callback:
+            progress_callback(100)
 
-        # Reshape back to image dimensions
-        stego_image = stego_flat.reshape(image.shape)
         return stego_image
 
-    def decode(self, stego_image_path):
-        """Extract hidden message from stego image"""
-        stego_image = cv2.imread(stego_image_path)
-        if stego_image is None:
-            raise ValueError("Could not read stego image")
-
-        # Get LSB of each byte
-        binary_data = ''
-        stego_flat = stego_image.flatten()
-        
-        # Extract until we find the delimiter
-        for byte in stego_flat:
-            binary_data += str(byte & 1)  # Get LSB
-            # Try to convert each 8 bits to character
-            if len(binary_data) >= 8:
-                # Convert binary string to text
-                all_bytes = [binary_data[i:i+8] for i in range(0, len(binary_data), 8)]
-                decoded_text = ''
-                for byte in all_bytes:
-                    if len(byte) == 8:
-                        decoded_text += chr(int(byte, 2))
-                        # Check if we found the delimiter
-                        if decoded_text.endswith(self.delimiter):
-                            return decoded_text[:-len(self.delimiter)]
-
-        return None  # No message found or delimiter not found
+    def encode_stream(self, cover_path, output_path, payload, progress_callback=None):
+        """Hide a payload in an uncompressed cover without loading it into memory
+
+        The cover (24-bit BMP or uint8 .npy) and the output, which must use the
+        same format, are memory-mapped and processed in bands of rows of about
+        stream_band_bytes each, so memory use does not grow with the image.
+        payload is bytes or an iterable of bytes chunks; the chunks are
+        consumed lazily. The container header needs the length and CRC-32,
+        so its bits are reserved first and written once the stream ends.
+        Streamed payloads are stored uncompressed, since choosing a codec
+        needs the whole payload.
+        Pixels are visited in the same order as encode_bytes, so the result
+        decodes with decode_bytes.
+        """
+        if not (is_mappable(cover_path) and is_mappable(output_path)):
+            raise ValueError("Streaming requires an uncompressed BMP or .npy cover")
+        if os.path.splitext(cover_path)[1].lower() != os.path.splitext(output_path)[1].lower():
+            raise ValueError("Stego output must use the same format as the cover")
+        if isinstance(payload, (bytes, bytearray, memoryview)):
+            payload = [payload]
+
+        cover = open_mapped(cover_path)
+        stego = create_mapped_like(cover_path, output_path)
+        reserved = header_size(CONTAINER_VERSION)
+        written = {'length': 0, 'crc': 0}
+
+        def source():
+            # Chỗ trống cho header, được ghi lại sau khi biết độ dài và CRC
+            yield bytes(reserved)
+            for chunk in payload:
+                chunk = bytes(chunk)
+                written['length'] += len(chunk)
+                written['crc'] = zlib.crc32(chunk, written['crc'])
+                yield chunk
+
+        chunks = source()
+        pending = bytearray()
+
+        def take(count):
+            # Lấy tối đa count byte payload, chỉ đọc thêm chunk khi cần
+            while len(pending) < count:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                pending.extend(chunk)
+            data = bytes(pending[:count])
+            del pending[:count]
+            return data
+
+        def write_band(top, bottom, data):
+            band = np.array(cover[top:bottom])
+            band_flat = band.reshape(-1)
+            bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+            band_flat[:bits.size] = (band_flat[:bits.size] & 254) | bits
+            stego[top:bottom] = band
+
+        # Số hàng mỗi dải là bội của 8 để mỗi dải chứa trọn vẹn các byte payload
+        height = cover.shape[0]
+        row_bytes = cover[0].size
+        band_rows = max(8, self.stream_band_bytes // row_bytes // 8 * 8)
+        failed = True
+        try:
+            for top in range(0, height, band_rows):
+                bottom = min(top + band_rows, height)
+                with span('lsb.stream.band', (bottom - top) * row_bytes):
+                    write_band(top, bottom, take((bottom - top) * row_bytes // 8))
+                    flush(stego)
+                if progress_callback:
+                    progress_callback(100 * bottom // height)
+
+            if take(1):
+                raise ValueError("Message too large for image")
+
+            header = pack_container_header(written['length'], written['crc'])
+            header_rows = -(-len(header) * 8 // row_bytes)
+            if header_rows > height:
+                raise ValueError("Message too large for image")
+            band = np.array(stego[:header_rows])
+            band_flat = band.reshape(-1)
+            bits = np.unpackbits(np.frombuffer(header, dtype=np.uint8))
+            band_flat[:bits.size] = (band_flat[:bits.size] & 254) | bits
+            stego[:header_rows] = band
+            flush(stego)
+            failed = False
+        finally:
+            chunks.close()
+            # Bỏ tham chiếu tới memmap trước khi xóa file (Windows không xóa được file đang map)
+            stego = None
+            if failed:
+                os.remove(output_path)
+        return output_path
+
+    def _read_bytes(self, stego_flat, start, count):
+        """Pack the LSBs of `count` bytes starting at byte offset `start`"""
+        bits = stego_flat[start * 8:(start + count) * 8] & 1
+        return np.packbits(bits).tobytes()
+
+    def decode(self, stego_image_path, progress_callback=None):
+        """Extract hidden message from stego image
+
+        BMP and .npy files are memory-mapped, so only the pages holding the
+        header and the message are read.
+        """
+        stego_image = open_image(stego_image_path, "Could not read stego image")
+        return self.decode_array(stego_image, progress_callback)
+
+    def decode_array(self, stego_image, progress_callback=None):
+        """Extract hidden message from a stego image array or encoded image bytes"""
+        data, encoding = self._extract(stego_image, progress_callback)
+        if data is None:
+            return None
+        if encoding is None:
+            raise ValueError("Hidden payload is binary data; use decode_bytes")
+        return data.decode(encoding)
+
+    def decode_bytes(self, stego_image, progress_callback=None):
+        """Extract the hidden payload as bytes, or None if there is none
+
+        stego_image may be a path, a BGR array or encoded image bytes. Text
+        messages are returned in the encoding they were stored with.
+        """
+        data, _ = self._extract(stego_image, progress_callback)
+        return data
+
+    def _extract(self, stego_image, progress_callback=None):
+        """Return (payload bytes, text encoding or None for binary data)"""
+        stego_image = as_image(stego_image, "Could not read stego image")
+        if progress_callback:
+            progress_callback(20)
+
+        stego_flat = flat_pixels(stego_image)
+
+        # Messages written with a header: read only the bits we need. A legacy
+        # message may itself start with "STG": if the header or payload does not
+        # check out, fall back to the delimiter scan and report the header error
+        # only when that finds nothing either
+        header_error = None
+        try:
+            with span('lsb.decode.header'):
+                header = read_header(lambda start, count: self._read_bytes(stego_flat, start, count))
+            if header is not None:
+                with span('lsb.decode.payload', header.length):
+                    data = self._read_bytes(stego_flat, header.size, header.length)
+                if header.version == CONTAINER_VERSION:
+                    data = check_payload(header, data)
+                elif len(data) < header.length:
+                    header = None  # Header is corrupt or image was truncated
+        except ValueError as e:
+            header, header_error = None, e
+        if header is not None:
+            if header.version == CONTAINER_VERSION:
+                with span('lsb.decode.decompress', len(data)):
+                    data = decompress(data, codec_from_flags(header.flags))
+                return data, 'utf-8' if header.flags & FLAG_TEXT else None
+            return data, 'latin-1'
+
+        # Legacy messages: pack LSBs chunk by chunk and search for the delimiter,
+        # stopping as soon as it is found
+        delimiter = self.delimiter.encode('latin-1')
+        total_bytes = stego_flat.size // 8
+        data = bytearray()
+        for start in range(0, total_bytes, self.scan_chunk_bytes):
+            count = min(self.scan_chunk_bytes, total_bytes - start)
+            search_from = max(0, len(data) - len(delimiter) + 1)
+            with span('lsb.decode.scan', count * 8):
+                data += self._read_bytes(stego_flat, start, count)
+                end = data.find(delimiter, search_from)
+            if end != -1:
+                return bytes(data[:end]), 'latin-1'
+            if progress_callback:
+                progress_callback(20 + 80 * (start + count) // total_bytes)
+
+        if header_error is not None:
+            raise header_error
+        return None, None  # No message found or delimiter not found
 
     def calculate_metrics(self, original_image_path, stego_image_path):
         """Calculate PSNR and MSE between original and stego images"""
-        original = cv2.imread(original_image_path)
-        stego = cv2.imread(stego_image_path)
-
-        if original is None or stego is None:
-            raise ValueError("Could not read images")
+        original = read_image(original_image_path, "Could not read images")
+        stego = read_image(stego_image_path, "Could not read images")
+        return self.calculate_metrics_array(original, stego)
 
+    def calculate_metrics_array(self, original, stego):
+        """Calculate PSNR and MSE between original and stego image arrays"""
+        original = as_image(original, "Could not read images")
+        stego = as_image(stego, "Could not read images")
         if original.shape != stego.shape:
             raise ValueError("Images have different dimensions")
 
-        # Calculate MSE
-        mse = np.mean((original - stego) ** 2)
-        
-        # Calculate PSNR
-        if mse == 0:
-            psnr = float('inf')
-        else:
-            psnr = 20 * np.log10(255.0 / np.sqrt(mse))
-
-        # Calculate capacity (in bytes)
-        capacity = (original.shape[0] * original.shape[1] * original.shape[2]) // 8
+        # Calculate MSE and PSNR
+        with span('lsb.metrics.mse_psnr', original.nbytes):
+            mse, psnr = mse_psnr(original, stego)
+
+        # Calculate usable capacity (in bytes), net of the container header
+        capacity = payload_capacity(original.shape, 'LSB', {'compression': self.compression})
 
         return {
             'psnr': psnr,
@@ -0,0 +1,109 @@
+import os
+import shutil
+import struct
+
+import numpy as np
+
+# Định dạng không nén có thể ánh xạ trực tiếp vào bộ nhớ
+MAPPABLE_EXTENSIONS = ('.bmp', '.npy')
+
+
+def is_mappable(path):
+    """True if the file's pixels can be memory-mapped instead of decoded"""
+    return isinstance(path, (str, os.PathLike)) and str(path).lower().endswith(MAPPABLE_EXTENSIONS)
+
+
+def _bmp_layout(path):
+    """Return (pixel offset, height, width, row stride, bottom_up) of a 24-bit BMP"""
+    with open(path, 'rb') as f:
+        header = f.read(30)
+    if len(header) < 30 or header[:2] != b'BM':
+        raise ValueError("Not a BMP file")
+
+    (offset,) = struct.unpack_from('<I', header, 10)
+    width, height, _, bits_per_pixel = struct.unpack_from('<iiHH', header, 18)
+    compression = 0
+    if struct.unpack_from('<I', header, 14)[0] >= 40:
+        with open(path, 'rb') as f:
+            f.seek(30)
+            (compression,) = struct.unpack('<I', f.read(4))
+    if bits_per_pixel != 24 or compression != 0:
+        raise ValueError("Only uncompressed 24-bit BMP files can be memory-mapped")
+
+    stride = (width * 3 + 3) // 4 * 4
+    return offset, abs(height), width, stride, height > 0
+
+
+def open_mapped(path, mode='r'):
+    """Memory-map the pixels of a BMP or .npy image as a (rows, cols, channels) array
+
+    Rows are always top-down and channels BGR, the same layout cv2.imread
+    returns, so embedding order matches the in-memory engines. Only the
+    pages that are actually indexed are read from disk.
+    """
+    if str(path).lower().endswith('.npy'):
+        pixels = np.load(path, mmap_mode=mode)
+        # Cùng bố cục với cv2.imread (BGR 3 kênh): các engine DWT/Hybrid cần [:, :, c]
+        if pixels.dtype != np.uint8 or pixels.ndim != 3 or pixels.shape[2] != 3:
+            raise ValueError("Only uint8 BGR image arrays of shape (rows, cols, 3) can be memory-mapped")
+        return pixels
+
+    offset, height, width, stride, bottom_up = _bmp_layout(path)
+    rows = np.memmap(path, dtype=np.uint8, mode=mode, offset=offset, shape=(height, stride))
+    pixels = rows[:, :width * 3].reshape(height, width, 3)
+    return pixels[::-1] if bottom_up else pixels
+
+
+def create_mapped_like(src_path, dst_path):
+    """Create an output file with the same format and size as src_path, mapped for writing"""
+    if str(src_path).lower().endswith('.npy'):
+        src = open_mapped(src_path)
+        return np.lib.format.open_memmap(dst_path, mode='w+', dtype=src.dtype, shape=src.shape)
+
+    # Giữ nguyên header BMP, phần pixel sẽ được ghi đè từng dải
+    shutil.copyfile(src_path, dst_path)
+    return open_mapped(dst_path, mode='r+')
+
+
+def flush(pixels):
+    """Write dirty pages of a mapped array back to its file"""
+    base = pixels
+    while base is not None and not isinstance(base, np.memmap):
+        base = base.base
+    if base is not None:
+        base.flush()
+
+
+class LazyRows:
+    """Read-only flat view over rows that are only produced when sliced
+
+    load_rows(first, last) returns rows [first, last) as a 2-D array of
+    row_size columns. Slicing the view loads just the rows that overlap the
+    slice, so reading a short header from a mapped image touches a few pages.
+    """
+
+    def __init__(self, row_count, row_size, load_rows, dtype):
+        self.row_size = row_size
+        self.size = row_count * row_size
+        self.dtype = np.dtype(dtype)
+        self._load_rows = load_rows
+
+    def __getitem__(self, index):
+        start, stop, step = index.indices(self.size)
+        if step != 1:
+            raise ValueError("LazyRows only supports contiguous slices")
+        if start >= stop:
+            return np.empty(0, dtype=self.dtype)
+        first = start // self.row_size
+        last = -(-stop // self.row_size)
+        offset = first * self.row_size
+        return self._load_rows(first, last).reshape(-1)[start - offset:stop - offset]
+
+
+def flat_pixels(pixels):
+    """Flat view of an image; strided maps (bottom-up BMP) are read lazily"""
+    if pixels.flags.c_contiguous:
+        return pixels.reshape(-1)
+    return LazyRows(pixels.shape[0], pixels[0].size,
+                    lambda first, last: np.ascontiguousarray(pixels[first:last]),
+                    pixels.dtype)
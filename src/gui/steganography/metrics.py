@@ -0,0 +1,140 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from .instrumentation import span
+
+# Tham số SSIM giống mặc định của skimage.metrics.structural_similarity
+SSIM_WINDOW = 7
+SSIM_K1 = 0.01
+SSIM_K2 = 0.03
+
+# SSIM được tính theo từng ô để bộ nhớ tạm (float64) không phụ thuộc kích thước ảnh
+SSIM_TILE_SIZE = 1024
+SSIM_WORKERS = 1
+
+
+def mse_psnr(original, stego):
+    """MSE and PSNR in one pass; cv2.norm accumulates squared differences in float64"""
+    mse = cv2.norm(original, stego, cv2.NORM_L2SQR) / original.size
+    if mse == 0:
+        psnr = float('inf')
+    else:
+        psnr = 20 * np.log10(255.0 / np.sqrt(mse))
+    return mse, psnr
+
+
+def channel_histograms(image):
+    """256-bin histogram of every channel, shape (channels, 256)"""
+    return np.stack([
+        cv2.calcHist([image], [channel], None, [256], [0, 256]).ravel()
+        for channel in range(image.shape[2])
+    ]).astype(np.float64)
+
+
+def histogram_difference(hist_orig, hist_stego):
+    """Mean over channels of the absolute histogram difference"""
+    return np.abs(hist_orig - hist_stego).sum(axis=1).mean()
+
+
+def chi_square(hist_orig, hist_stego):
+    """Mean over channels of the chi-square distance between histograms"""
+    # Tránh chia cho 0
+    expected = hist_orig + 1e-10
+    return ((expected - hist_stego) ** 2 / expected).sum(axis=1).mean()
+
+
+def _ssim_map(a, b, data_range):
+    """Local SSIM values; only entries at least 3 pixels from the border are valid"""
+    a = a.astype(np.float64)
+    b = b.astype(np.float64)
+    window = (SSIM_WINDOW, SSIM_WINDOW)
+    n = SSIM_WINDOW * SSIM_WINDOW
+    cov_norm = n / (n - 1)
+
+    def local_mean(x):
+        return cv2.boxFilter(x, cv2.CV_64F, window, borderType=cv2.BORDER_REFLECT)
+
+    ux, uy = local_mean(a), local_mean(b)
+    vx = cov_norm * (local_mean(a * a) - ux * ux)
+    vy = cov_norm * (local_mean(b * b) - uy * uy)
+    vxy = cov_norm * (local_mean(a * b) - ux * uy)
+
+    c1 = (SSIM_K1 * data_range) ** 2
+    c2 = (SSIM_K2 * data_range) ** 2
+    return ((2 * ux * uy + c1) * (2 * vxy + c2)) / ((ux * ux + uy * uy + c1) * (vx + vy + c2))
+
+
+def structural_similarity(gray_a, gray_b, data_range=255,
+                          tile_size=SSIM_TILE_SIZE, workers=SSIM_WORKERS):
+    """Mean SSIM of two grayscale images
+
+    Same definition as skimage's default (7x7 uniform window, sample
+    covariance, border of 3 pixels excluded), but every local mean comes
+    from cv2.boxFilter instead of scipy's uniform_filter.
+
+    The image is processed in tiles of at most tile_size x tile_size
+    output pixels, each read with a 3-pixel overlap so results match the
+    untiled computation; peak memory depends on tile_size, not on the image.
+    workers > 1 computes tiles on that many threads.
+    """
+    pad = (SSIM_WINDOW - 1) // 2
+    height, width = gray_a.shape
+    if height <= 2 * pad or width <= 2 * pad:
+        raise ValueError(f"Images must be larger than {SSIM_WINDOW}x{SSIM_WINDOW} for SSIM")
+
+    def tile_sum(origin):
+        # Ô đầu ra [top, bottom) x [left, right), đọc thêm pad pixel mỗi phía
+        top, left = origin
+        bottom = min(top + tile_size, height - pad)
+        right = min(left + tile_size, width - pad)
+        rows = slice(top - pad, bottom + pad)
+        cols = slice(left - pad, right + pad)
+        s = _ssim_map(gray_a[rows, cols], gray_b[rows, cols], data_range)
+        return s[pad:-pad, pad:-pad].sum()
+
+    origins = [(top, left)
+               for top in range(pad, height - pad, tile_size)
+               for left in range(pad, width - pad, tile_size)]
+    if workers > 1 and len(origins) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            total = sum(executor.map(tile_sum, origins))
+    else:
+        total = sum(map(tile_sum, origins))
+
+    return total / ((height - 2 * pad) * (width - 2 * pad))
+
+
+def quality_metrics(original, stego, progress_callback=None):
+    """All SteganographyAnalyst quality metrics from shared intermediates
+
+    Each channel histogram is computed once and feeds both the histogram
+    difference and the chi-square statistic.
+    """
+    with span('analyst.metrics.mse_psnr', original.nbytes):
+        mse, psnr = mse_psnr(original, stego)
+    if progress_callback:
+        progress_callback(20)
+
+    # Chuyển sang ảnh xám để tính SSIM
+    with span('analyst.metrics.ssim', original.nbytes):
+        original_gray = cv2.cvtColor(original, cv2.COLOR_BGR2GRAY)
+        stego_gray = cv2.cvtColor(stego, cv2.COLOR_BGR2GRAY)
+        ssim = structural_similarity(original_gray, stego_gray)
+    if progress_callback:
+        progress_callback(70)
+
+    with span('analyst.metrics.histograms', original.nbytes):
+        hist_orig = channel_histograms(original)
+        hist_stego = channel_histograms(stego)
+        metrics = {
+            'psnr': psnr,
+            'mse': mse,
+            'ssim': ssim,
+            'histogram_difference': histogram_difference(hist_orig, hist_stego),
+            'chi_square': chi_square(hist_orig, hist_stego)
+        }
+    if progress_callback:
+        progress_callback(100)
+    return metrics
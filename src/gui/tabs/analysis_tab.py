@@ -1,13 +1,16 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
-                           QLabel, QFrame, QGridLayout, QFileDialog, QMessageBox)
-from PyQt6.QtCore import Qt
+                           QLabel, QFrame, QGridLayout, QFileDialog, QMessageBox,
+                           QProgressBar)
+from PyQt6.QtCore import Qt, QThreadPool
 from ..widgets.image_viewer import ImageViewer
 from ..steganography.analyst import SteganographyAnalyst
+from ..workers import StegoWorker
 
 class AnalysisTab(QWidget):
     def __init__(self):
         super().__init__()
         self.analyst = SteganographyAnalyst()
+        self.worker = None
         self.init_ui()
 
     def init_ui(self):
@@ -105,6 +108,25 @@ class AnalysisTab(QWidget):
         button_layout.addStretch()
 
         content_layout.addLayout(button_layout)
+
+        # Progress bar
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setStyleSheet("""
+            QProgressBar {
+                border: none;
+                border-radius: 2px;
+                background-color: #363636;
+                height: 3px;
+                text-align: center;
+            }
+            QProgressBar::chunk {
+                background-color: #0066ff;
+                border-radius: 2px;
+            }
+        """)
+        self.progress_bar.hide()
+        content_layout.addWidget(self.progress_bar)
+
         layout.addWidget(content)
 
         # Connect buttons
@@ -161,25 +183,42 @@ class AnalysisTab(QWidget):
                                  QMessageBox.Icon.Warning)
             return
 
-        try:
-            # Get analysis results
-            metrics = self.analyst.calculate_metrics(
-                self.original_viewer.get_image_path(),
-                self.stego_viewer.get_image_path()
-            )
-            
-            # Update metrics labels
-            self.metrics_labels['psnr'].setText(f"PSNR: {metrics['psnr']:.2f} dB")
-            self.metrics_labels['mse'].setText(f"MSE: {metrics['mse']:.6f}")
-            self.metrics_labels['ssim'].setText(f"SSIM: {metrics['ssim']:.4f}")
-            self.metrics_labels['histogram_diff'].setText(f"Histogram Difference: {metrics['histogram_difference']:.2f}")
-            self.metrics_labels['chi_square'].setText(f"Chi-Square: {metrics['chi_square']:.2f}")
-
-            self.show_dark_message("Success", "Analysis completed successfully!")
-
-        except Exception as e:
-            self.show_dark_message("Error", f"An error occurred: {str(e)}", 
-                                 QMessageBox.Icon.Critical)
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.analyze_btn.setEnabled(False)
+
+        # Phân tích trên thread riêng để giao diện không bị treo
+        self.worker = StegoWorker(
+            self.analyst.calculate_metrics,
+            self.original_viewer.get_image_path(),
+            self.stego_viewer.get_image_path()
+        )
+        self.worker.signals.progress.connect(self.progress_bar.setValue)
+        self.worker.signals.finished.connect(self.on_analysis_finished)
+        self.worker.signals.error.connect(self.on_analysis_error)
+        QThreadPool.globalInstance().start(self.worker)
+
+    def on_analysis_finished(self, metrics):
+        self._reset_progress()
+
+        # Update metrics labels
+        self.metrics_labels['psnr'].setText(f"PSNR: {metrics['psnr']:.2f} dB")
+        self.metrics_labels['mse'].setText(f"MSE: {metrics['mse']:.6f}")
+        self.metrics_labels['ssim'].setText(f"SSIM: {metrics['ssim']:.4f}")
+        self.metrics_labels['histogram_diff'].setText(f"Histogram Difference: {metrics['histogram_difference']:.2f}")
+        self.metrics_labels['chi_square'].setText(f"Chi-Square: {metrics['chi_square']:.2f}")
+
+        self.show_dark_message("Success", "Analysis completed successfully!")
+
+    def on_analysis_error(self, error):
+        self._reset_progress()
+        self.show_dark_message("Error", f"An error occurred: {error}",
+                             QMessageBox.Icon.Critical)
+
+    def _reset_progress(self):
+        self.worker = None
+        self.analyze_btn.setEnabled(True)
+        self.progress_bar.hide()
 
     def show_dark_message(self, title, message, icon=QMessageBox.Icon.Information):
         msg = QMessageBox()
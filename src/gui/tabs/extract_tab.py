@@ -1,8 +1,9 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                            QLabel, QTextEdit, QFileDialog, QFrame, QComboBox,
-                           QLineEdit, QApplication, QProgressBar, QMessageBox)
-from PyQt6.QtCore import Qt
+                           QLineEdit, QProgressBar, QMessageBox)
+from PyQt6.QtCore import Qt, QThreadPool
 from ..widgets.image_viewer import ImageViewer
+from ..workers import StegoWorker
 from ..steganography.lsb import LSBSteganography
 from ..steganography.dwt import DWTSteganography
 from ..steganography.hybrid import HybridSteganography
@@ -11,6 +12,7 @@ import os
 class ExtractTab(QWidget):
     def __init__(self):
         super().__init__()
+        self.worker = None
         self.stego_methods = {
             'LSB': LSBSteganography(),
             'DWT': DWTSteganography(),
@@ -199,7 +201,31 @@ class ExtractTab(QWidget):
                 color: #808080;
             }
         """)
-        content_layout.addWidget(self.extract_btn)
+
+        # Cancel button, shown while an extraction is running
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #363636;
+                color: #ffffff;
+                border: 1px solid #404040;
+                border-radius: 3px;
+                padding: 5px 15px;
+                font-size: 12px;
+                min-height: 25px;
+            }
+            QPushButton:hover {
+                background-color: #404040;
+                border: 1px solid #4d4d4d;
+            }
+        """)
+        self.cancel_btn.hide()
+
+        button_layout = QHBoxLayout()
+        button_layout.setSpacing(8)
+        button_layout.addWidget(self.extract_btn, 1)
+        button_layout.addWidget(self.cancel_btn)
+        content_layout.addLayout(button_layout)
 
         # Message output
         message_area = QWidget()
@@ -239,6 +265,7 @@ class ExtractTab(QWidget):
         # Connect signals
         self.load_btn.clicked.connect(self.load_image)
         self.extract_btn.clicked.connect(self.extract_message)
+        self.cancel_btn.clicked.connect(self.cancel_extraction)
         self.method_combo.currentTextChanged.connect(self.on_method_change)
 
     def show_dark_message(self, title, message, icon=QMessageBox.Icon.Information):
@@ -294,44 +321,61 @@ class ExtractTab(QWidget):
         method = self.method_combo.currentText()
         stego = self.stego_methods[method]
 
-        try:
-            # Show progress
-            self.progress_bar.setValue(0)
-            self.progress_bar.show()
-            self.extract_btn.setEnabled(False)
-            QApplication.processEvents()
-
-            # Extract message
-            if method == 'LSB':
-                message = stego.decode(self.stego_viewer.get_image_path())
-            else:
-                password = self.password_input.text()
-                if not password:
-                    self.show_dark_message("Warning", "Password is required!", QMessageBox.Icon.Warning)
-                    return
-                message = stego.decode(self.stego_viewer.get_image_path(), password)
-
-            # Update progress
-            self.progress_bar.setValue(100)
-            QApplication.processEvents()
-
-            # Show message
-            if message:
-                self.message_output.setText(message)
-                self.show_dark_message(
-                    "Success",
-                    "Message extracted successfully!",
-                    QMessageBox.Icon.Information
-                )
-            else:
-                self.show_dark_message(
-                    "Error",
-                    "No message found or invalid password!",
-                    QMessageBox.Icon.Critical
-                )
-
-        except Exception as e:
-            self.show_dark_message("Error", f"An error occurred: {str(e)}", QMessageBox.Icon.Critical)
-        finally:
-            self.extract_btn.setEnabled(True)
-            self.progress_bar.hide() 
\ No newline at end of file
+        password = self.password_input.text()
+        if method != 'LSB' and not password:
+            self.show_dark_message("Warning", "Password is required!", QMessageBox.Icon.Warning)
+            return
+
+        # Show progress
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.extract_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(True)
+        self.cancel_btn.show()
+
+        # Trích xuất trên thread riêng để giao diện không bị treo
+        if method == 'LSB':
+            self.worker = StegoWorker(stego.decode, self.stego_viewer.get_image_path())
+        else:
+            self.worker = StegoWorker(stego.decode, self.stego_viewer.get_image_path(), password)
+        self.worker.signals.progress.connect(self.progress_bar.setValue)
+        self.worker.signals.finished.connect(self.on_extract_finished)
+        self.worker.signals.error.connect(self.on_extract_error)
+        self.worker.signals.cancelled.connect(self.on_extract_cancelled)
+        QThreadPool.globalInstance().start(self.worker)
+
+    def cancel_extraction(self):
+        if self.worker:
+            self.worker.cancel()
+            self.cancel_btn.setEnabled(False)
+
+    def on_extract_finished(self, message):
+        self._reset_progress()
+
+        # Show message
+        if message:
+            self.message_output.setText(message)
+            self.show_dark_message(
+                "Success",
+                "Message extracted successfully!",
+                QMessageBox.Icon.Information
+            )
+        else:
+            self.show_dark_message(
+                "Error",
+                "No message found or invalid password!",
+                QMessageBox.Icon.Critical
+            )
+
+    def on_extract_error(self, error):
+        self._reset_progress()
+        self.show_dark_message("Error", f"An error occurred: {error}", QMessageBox.Icon.Critical)
+
+    def on_extract_cancelled(self):
+        self._reset_progress()
+
+    def _reset_progress(self):
+        self.worker = None
+        self.extract_btn.setEnabled(True)
+        self.cancel_btn.hide()
+        self.progress_bar.hide()
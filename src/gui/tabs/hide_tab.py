@@ -1,20 +1,20 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                            QLabel, QTextEdit, QFileDialog, QFrame, QComboBox,
-                           QLineEdit, QApplication, QProgressBar, QMessageBox)
-from PyQt6.QtCore import Qt
+                           QLineEdit, QProgressBar, QMessageBox)
+from PyQt6.QtCore import Qt, QThreadPool
 from ..widgets.image_viewer import ImageViewer
+from ..workers import StegoWorker
 from ..steganography.lsb import LSBSteganography
 from ..steganography.dwt import DWTSteganography
 from ..steganography.hybrid import HybridSteganography
 import cv2
-import os
-import tempfile
 
 class HideTab(QWidget):
     def __init__(self):
         super().__init__()
         # Khởi tạo các biến
-        self.temp_path = None
+        self.worker = None
+        self.hide_request = None  # (method, message) của lần giấu tin đang chạy
         self.stego_methods = {
             'LSB': LSBSteganography(),
             'DWT': DWTSteganography(),
@@ -305,7 +305,7 @@ class HideTab(QWidget):
             self.password_input.setPlaceholderText("Enter password to encrypt message")
 
     def hide_message(self):
-        if not self.original_viewer.get_image_path():
+        if self.original_viewer.get_image_array() is None:
             self.show_dark_message("Warning", "Please upload an image first!", QMessageBox.Icon.Warning)
             return
 
@@ -317,71 +317,75 @@ class HideTab(QWidget):
         # Lấy phương thức được chọn
         method = self.method_combo.currentText()
         stego = self.stego_methods[method]
-        
-        try:
-            # Show progress bar
-            self.progress_bar.setValue(0)
-            self.progress_bar.show()
-            self.hide_btn.setEnabled(False)
-            QApplication.processEvents()
-
-            # Hide message - chỉ dùng password cho DWT và Hybrid
-            if method == 'LSB':
-                stego_image = stego.encode(
-                    self.original_viewer.get_image_path(),
-                    message
-                )
-            else:
-                password = self.password_input.text()
-                stego_image = stego.encode(
-                    self.original_viewer.get_image_path(),
-                    message,
-                    password
-                )
 
-            # Update progress
-            self.progress_bar.setValue(50)
-            QApplication.processEvents()
-
-            # Save and display result
-            if self.temp_path and os.path.exists(self.temp_path):
-                os.remove(self.temp_path)
-            
-            self.temp_path = os.path.join(tempfile.gettempdir(), f"temp_stego_{method}.png")
-            cv2.imwrite(self.temp_path, stego_image)
-            self.stego_viewer.load_image(self.temp_path)
-
-            # Calculate metrics
-            metrics = stego.calculate_metrics(
-                self.original_viewer.get_image_path(),
-                self.temp_path
-            )
-
-            # Update progress
-            self.progress_bar.setValue(100)
-            QApplication.processEvents()
-
-            # Show results
-            info_text = (
-                f"Message hidden successfully using {method}!\n\n"
-                f"Image Quality (PSNR): {metrics['psnr']:.2f} dB\n"
-                f"Maximum capacity: {metrics['capacity']} bytes\n"
-                f"Message size: {len(message)} bytes\n"
-                f"Password protected: {'Yes' if method != 'LSB' else 'No'}\n\n"
-                f"Use Save Image to keep the result."
-            )
-            
-            self.show_dark_message(
-                "Success", 
-                info_text,
-                QMessageBox.Icon.Information
-            )
-
-        except Exception as e:
-            self.show_dark_message("Error", f"An error occurred: {str(e)}", QMessageBox.Icon.Critical)
-        finally:
-            self.hide_btn.setEnabled(True)
-            self.progress_bar.hide()
+        # Show progress bar
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.hide_btn.setEnabled(False)
+
+        # Giấu tin trên thread riêng để giao diện không bị treo
+        self.hide_request = (method, message)
+        self.worker = StegoWorker(
+            self._run_hide,
+            stego,
+            method,
+            self.original_viewer.get_image_array(),
+            message,
+            self.password_input.text()
+        )
+        self.worker.signals.progress.connect(self.progress_bar.setValue)
+        self.worker.signals.finished.connect(self.on_hide_finished)
+        self.worker.signals.error.connect(self.on_hide_error)
+        QThreadPool.globalInstance().start(self.worker)
+
+    def _run_hide(self, stego, method, image, message, password, progress_callback):
+        """Runs on a QThreadPool thread: hide the message and compute metrics"""
+        # Giai đoạn giấu tin chiếm 80% thanh tiến trình
+        def encode_progress(percent):
+            progress_callback(percent * 0.8)
+
+        # Hide message - chỉ dùng password cho DWT và Hybrid
+        if method == 'LSB':
+            stego_image = stego.encode_array(image, message, progress_callback=encode_progress)
+        else:
+            stego_image = stego.encode_array(image, message, password,
+                                             progress_callback=encode_progress)
+
+        # Calculate metrics trực tiếp trên mảng ảnh, không ghi file tạm
+        metrics = stego.calculate_metrics_array(image, stego_image)
+        progress_callback(100)
+        return stego_image, metrics
+
+    def on_hide_finished(self, result):
+        stego_image, metrics = result
+        method, message = self.hide_request
+        self.stego_viewer.load_image_from_array(stego_image)
+        self._reset_progress()
+
+        # Show results
+        info_text = (
+            f"Message hidden successfully using {method}!\n\n"
+            f"Image Quality (PSNR): {metrics['psnr']:.2f} dB\n"
+            f"Maximum capacity: {metrics['capacity']} bytes\n"
+            f"Message size: {len(message)} bytes\n"
+            f"Password protected: {'Yes' if method != 'LSB' else 'No'}\n\n"
+            f"Use Save Image to keep the result."
+        )
+
+        self.show_dark_message(
+            "Success",
+            info_text,
+            QMessageBox.Icon.Information
+        )
+
+    def on_hide_error(self, error):
+        self._reset_progress()
+        self.show_dark_message("Error", f"An error occurred: {error}", QMessageBox.Icon.Critical)
+
+    def _reset_progress(self):
+        self.worker = None
+        self.hide_btn.setEnabled(True)
+        self.progress_bar.hide()
 
     def load_image(self):
         file_name, _ = QFileDialog.getOpenFileName(
@@ -423,7 +427,8 @@ class HideTab(QWidget):
         msg.exec()
 
     def save_image(self):
-        if not self.stego_viewer.get_image_path():
+        stego_image = self.stego_viewer.get_image_array()
+        if stego_image is None:
             self.show_dark_message("Warning", "No stego image to save!", QMessageBox.Icon.Warning)
             return
 
@@ -435,8 +440,9 @@ class HideTab(QWidget):
         )
         if file_name:
             try:
-                stego_image = cv2.imread(self.stego_viewer.get_image_path())
-                cv2.imwrite(file_name, stego_image)
+                # Lần mã hóa PNG duy nhất của cả quá trình giấu tin
+                if not cv2.imwrite(file_name, stego_image):
+                    raise ValueError("Could not write image")
                 self.show_dark_message(
                     "Success", 
                     "Stego image saved successfully!",
@@ -448,12 +454,3 @@ class HideTab(QWidget):
                     f"Failed to save image: {str(e)}",
                     QMessageBox.Icon.Critical
                 )
-
-    def closeEvent(self, event):
-        # Cleanup temp file when closing
-        if self.temp_path and os.path.exists(self.temp_path):
-            try:
-                os.remove(self.temp_path)
-            except:
-                pass
-        super().closeEvent(event) 
\ No newline at end of file
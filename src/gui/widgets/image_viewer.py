@@ -3,13 +3,13 @@ from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QImage, QPixmap
 import cv2
 import numpy as np
-from PIL import Image
-import io
+from ..steganography.image_io import image_cache
 
 class ImageViewer(QLabel):
     def __init__(self):
         super().__init__()
         self.image_path = None
+        self.image_array = None  # Ảnh BGR đã giải mã, dùng lại thay vì đọc file lần nữa
         self.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
         self.setMinimumSize(200, 150)
@@ -25,13 +25,16 @@ class ImageViewer(QLabel):
     def load_image(self, image_path):
         """Load image from file path"""
         self.image_path = image_path
-        image = cv2.imread(image_path)
+        image = image_cache.get(image_path)  # Dùng chung bộ nhớ đệm với các engine
+        self.image_array = image
         if image is not None:
             image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
             self._display_image(image)
 
     def load_image_from_array(self, image_array):
         """Load image from numpy array (BGR format)"""
+        self.image_path = None
+        self.image_array = image_array
         if image_array is not None:
             if len(image_array.shape) == 2:  # Grayscale
                 image_array = cv2.cvtColor(image_array, cv2.COLOR_GRAY2RGB)
@@ -76,6 +79,10 @@ class ImageViewer(QLabel):
         """Return the current image path"""
         return self.image_path
 
+    def get_image_array(self):
+        """Return the current image as a BGR numpy array"""
+        return self.image_array
+
     def resizeEvent(self, event):
         """Handle resize events to maintain aspect ratio"""
         super().resizeEvent(event)
@@ -0,0 +1,50 @@
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+
+class OperationCancelled(Exception):
+    """Raised inside a worker when the user cancels the operation"""
+
+
+class WorkerSignals(QObject):
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object)
+    error = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+class StegoWorker(QRunnable):
+    """Run a stego operation on a QThreadPool thread
+
+    `func` is called with the given arguments plus a `progress_callback`
+    keyword. Each call to the callback emits `progress` and, once cancel()
+    has been requested, raises OperationCancelled to unwind the operation.
+    """
+
+    def __init__(self, func, *args, **kwargs):
+        super().__init__()
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def _report_progress(self, percent):
+        if self._cancelled:
+            raise OperationCancelled()
+        self.signals.progress.emit(int(percent))
+
+    def run(self):
+        try:
+            result = self.func(*self.args, progress_callback=self._report_progress, **self.kwargs)
+        except OperationCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        else:
+            if self._cancelled:
+                self.signals.cancelled.emit()
+            else:
+                self.signals.finished.emit(result)
@@ -1,4 +1,52 @@
-from gui.main_window import main
+import os
+import sys
+
+# Chế độ đo thời gian import: `python main.py --import-times` hoặc STEGO_IMPORT_TIMES=1
+IMPORT_TIMES_FLAG = '--import-times'
+IMPORT_TIMES_ENV = 'STEGO_IMPORT_TIMES'
+IMPORT_TIMES_LIMIT = 25
+
+
+def run_with_import_times(argv, limit=IMPORT_TIMES_LIMIT):
+    """Run the app under `python -X importtime` and report import cost per module
+
+    The app runs in a child process; its other stderr output is passed
+    through. When it exits, the top-level imports are listed in load order
+    (what a tab pulls in shows up when the tab is first opened), followed
+    by the slowest modules by self time.
+    """
+    import subprocess
+
+    env = {k: v for k, v in os.environ.items() if k != IMPORT_TIMES_ENV}
+    command = [sys.executable, '-X', 'importtime', os.path.abspath(__file__), *argv]
+    modules = []  # (tên module, self µs, cumulative µs, độ sâu)
+    with subprocess.Popen(command, stderr=subprocess.PIPE, text=True, env=env) as process:
+        for line in process.stderr:
+            if not line.startswith('import time:'):
+                sys.stderr.write(line)
+                continue
+            fields = line[len('import time:'):].split('|')
+            if len(fields) != 3 or not fields[0].strip().isdigit():
+                continue  # Dòng tiêu đề
+            name = fields[2].rstrip('\n')
+            depth = (len(name) - len(name.lstrip(' '))) // 2
+            modules.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+
+    total = sum(module[1] for module in modules)
+    print(f"\nImported {len(modules)} modules in {total / 1000:.1f} ms", file=sys.stderr)
+    print("\nTop-level imports (load order, cumulative ms):", file=sys.stderr)
+    for name, _, cumulative, depth in modules:
+        if depth == 0:
+            print(f"  {cumulative / 1000:9.1f}  {name}", file=sys.stderr)
+    print(f"\nSlowest {limit} modules (self ms, cumulative ms):", file=sys.stderr)
+    for name, self_time, cumulative, _ in sorted(modules, key=lambda m: -m[1])[:limit]:
+        print(f"  {self_time / 1000:9.1f}  {cumulative / 1000:9.1f}  {name}", file=sys.stderr)
+    return process.returncode
+
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    if IMPORT_TIMES_FLAG in sys.argv[1:] or os.environ.get(IMPORT_TIMES_ENV):
+        sys.exit(run_with_import_times([a for a in sys.argv[1:] if a != IMPORT_TIMES_FLAG]))
+
+    from gui.main_window import main
+    main()
@@ -1,12 +1,13 @@
-import numpy as np
-import cv2
-import pywt
-from PIL import Image
-import matplotlib.pyplot as plt
-
 def test_environment():
     """Test if all required libraries are properly installed"""
     try:
+        # Import tại đây: nạp module này không kéo theo cv2, pywt, matplotlib
+        import numpy as np
+        import cv2
+        import pywt
+        from PIL import Image
+        import matplotlib.pyplot as plt
+
         # Test NumPy
         arr = np.array([1, 2, 3])
         print("NumPy is working")
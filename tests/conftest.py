@@ -0,0 +1,17 @@
+import os
+import sys
+
+import cv2
+import pytest
+
+# Các module được import như khi chạy `python src/main.py`: gói gốc là `gui`
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+PASSWORD = 'fixture-pw'
+
+
+@pytest.fixture
+def cover():
+    """128x96 BGR cover: smooth gradients plus mild noise"""
+    return cv2.imread(os.path.join(FIXTURES, 'cover.png'))
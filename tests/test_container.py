@@ -0,0 +1,83 @@
+import zlib
+
+import pytest
+from conftest import PASSWORD
+
+from gui.steganography.compression import codec_flags, codec_from_flags
+from gui.steganography.dwt import DWTSteganography
+from gui.steganography.header import (CONTAINER_VERSION, FLAG_ENCRYPTED, FLAG_LIFTING, FLAG_TEXT,
+                                      check_payload, header_size, pack_container, read_header)
+from gui.steganography.hybrid import HybridSteganography
+from gui.steganography.lsb import LSBSteganography
+
+
+def _reader(data):
+    return lambda start, count: data[start:start + count]
+
+
+def test_v3_header_round_trip_with_codec_and_kdf():
+    salt = bytes(range(16))
+    flags = FLAG_TEXT | FLAG_LIFTING | codec_flags('lzma')
+    container = pack_container(b'payload', flags, salt, 14)
+
+    header = read_header(_reader(container))
+    assert header.version == CONTAINER_VERSION
+    assert header.flags & FLAG_ENCRYPTED and header.flags & FLAG_TEXT and header.flags & FLAG_LIFTING
+    assert codec_from_flags(header.flags) == 'lzma'
+    assert (header.log_n, header.salt) == (14, salt)
+    assert header.size == header_size(CONTAINER_VERSION, FLAG_ENCRYPTED)
+    assert header.length == len(b'payload') and header.crc == zlib.crc32(b'payload')
+    assert check_payload(header, container[header.size:]) == b'payload'
+
+
+def test_v3_header_without_kdf_block():
+    container = pack_container(b'abc', FLAG_TEXT)
+    header = read_header(_reader(container))
+    assert header.salt is None and not header.flags & FLAG_ENCRYPTED
+    assert header.size == header_size(CONTAINER_VERSION)
+
+
+def test_check_payload_rejects_flipped_bit_and_truncation():
+    container = pack_container(b'some payload')
+    header = read_header(_reader(container))
+    payload = bytearray(container[header.size:])
+    payload[3] ^= 0x10
+    with pytest.raises(ValueError, match='CRC'):
+        check_payload(header, bytes(payload))
+    with pytest.raises(ValueError, match='truncated'):
+        check_payload(header, container[header.size:-1])
+
+
+def test_lsb_flipped_payload_bit_fails_crc(cover):
+    engine = LSBSteganography()
+    stego = engine.encode_array(cover, 'a message long enough to flip a bit in')
+    bit = (header_size(CONTAINER_VERSION) + 5) * 8 + 2
+    stego.reshape(-1)[bit] ^= 1
+    with pytest.raises(ValueError, match='CRC'):
+        engine.decode_array(stego)
+
+
+def _flip_lifting_cH(stego, k):
+    """Flip the parity of blue cH coefficient k by raising both lower pixels of its block"""
+    i, j = divmod(k, (stego.shape[1] + 1) // 2)
+    lower = stego[2 * i + 1, 2 * j:2 * j + 2, 0]
+    assert 0 < lower.min() and lower.max() < 255
+    lower += 1  # floor((c + d) / 2) tăng đúng 1
+
+
+def test_dwt_flipped_payload_bit_fails_crc(cover):
+    engine = DWTSteganography()
+    stego = engine.encode_array(cover, 'a message long enough to flip a bit in', PASSWORD)
+    _flip_lifting_cH(stego, (header_size(CONTAINER_VERSION, FLAG_ENCRYPTED) + 10) * 8 + 3)
+    with pytest.raises(ValueError, match='CRC'):
+        engine.decode_array(stego, PASSWORD)
+
+
+def test_hybrid_flipped_payload_bit_is_detected(cover):
+    engine = HybridSteganography()
+    stego = engine.encode_array(cover, 'a message long enough to flip a bit in', PASSWORD)
+    k = (header_size(CONTAINER_VERSION, FLAG_ENCRYPTED) + 10) * 8 + 3
+    i, j = divmod(k, stego.shape[1] // 2)
+    stego[2 * i, 2 * j, 0] ^= 1  # Bản sao LSB
+    with pytest.raises(ValueError, match='corrupt'):
+        engine.decode_array(stego, PASSWORD)
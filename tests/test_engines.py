@@ -0,0 +1,94 @@
+import os
+
+import numpy as np
+import pytest
+from conftest import FIXTURES, PASSWORD
+
+from gui.steganography.dwt import DWTSteganography
+from gui.steganography.hybrid import HybridSteganography
+from gui.steganography.lsb import LSBSteganography
+
+ENGINES = {
+    'LSB': LSBSteganography,
+    'DWT': DWTSteganography,
+    'Hybrid': HybridSteganography,
+}
+
+
+def _encode(method, engine, cover, message):
+    if method == 'LSB':
+        return engine.encode_array(cover, message)
+    return engine.encode_array(cover, message, PASSWORD)
+
+
+def _decode(method, engine, stego, binary=False):
+    args = (stego,) if method == 'LSB' else (stego, PASSWORD)
+    return engine.decode_bytes(*args) if binary else engine.decode_array(*args)
+
+
+@pytest.mark.parametrize('method', ENGINES)
+@pytest.mark.parametrize('compression', ['auto', 'none', 'zlib'])
+def test_text_round_trip(method, compression, cover):
+    engine = ENGINES[method]()
+    engine.compression = compression
+    message = 'Xin chào, thế giới! ' * 4
+    stego = _encode(method, engine, cover, message)
+    assert stego.shape == cover.shape and stego.dtype == np.uint8
+    assert _decode(method, engine, stego) == message
+
+
+@pytest.mark.parametrize('method', ENGINES)
+def test_bytes_round_trip(method, cover):
+    engine = ENGINES[method]()
+    data = np.random.default_rng(7).bytes(120)
+    args = (cover, data) if method == 'LSB' else (cover, data, PASSWORD)
+    stego = engine.encode_bytes(*args)
+    assert _decode(method, engine, stego, binary=True) == data
+    with pytest.raises(ValueError, match='binary'):
+        _decode(method, engine, stego)
+
+
+@pytest.mark.parametrize('method', ['DWT', 'Hybrid'])
+def test_wrong_password_is_rejected(method, cover):
+    engine = ENGINES[method]()
+    stego = _encode(method, engine, cover, 'secret')
+    with pytest.raises(ValueError):
+        engine.decode_array(stego, 'not the password')
+
+
+def test_dwt_and_hybrid_images_do_not_decode_as_each_other(cover):
+    dwt, hybrid = DWTSteganography(), HybridSteganography()
+    with pytest.raises(ValueError):
+        hybrid.decode_array(dwt.encode_array(cover, 'dwt', PASSWORD), PASSWORD)
+    with pytest.raises(ValueError):
+        dwt.decode_array(hybrid.encode_array(cover, 'hybrid', PASSWORD), PASSWORD)
+
+
+# Ảnh do các phiên bản trước ghi (định dạng có dấu kết thúc, header v1 và v2)
+@pytest.mark.parametrize('name', [
+    'lsb_legacy', 'lsb_v1',
+    'dwt_legacy', 'dwt_v1', 'dwt_v2',
+    'hybrid_legacy', 'hybrid_v1', 'hybrid_v2',
+])
+def test_decodes_images_written_by_earlier_versions(name):
+    method, kind = name.split('_')
+    method = {'lsb': 'LSB', 'dwt': 'DWT', 'hybrid': 'Hybrid'}[method]
+    engine = ENGINES[method]()
+    path = os.path.join(FIXTURES, name + '.png')
+    message = engine.decode(path) if method == 'LSB' else engine.decode(path, PASSWORD)
+    assert message == f'{method} {kind} fixture message'
+
+
+def test_legacy_lsb_message_starting_with_magic(cover):
+    engine = LSBSteganography()
+    stego = engine.encode_array(cover, 'STGEORGE meeting at 5', use_header=False)
+    assert engine.decode_array(stego) == 'STGEORGE meeting at 5'
+
+
+@pytest.mark.parametrize('method', ['DWT', 'Hybrid'])
+@pytest.mark.parametrize('transform', ['lifting', 'float'])
+def test_only_haar_wavelet_is_accepted(method, transform, cover):
+    engine = ENGINES[method]()
+    engine.wavelet, engine.transform = 'db2', transform
+    with pytest.raises(ValueError, match='wavelet'):
+        engine.encode_array(cover, 'msg', PASSWORD)
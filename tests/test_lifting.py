@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from conftest import PASSWORD
+
+from gui.steganography.capacity import capacity
+from gui.steganography.dwt import DWTSteganography
+from gui.steganography.hybrid import HybridSteganography
+from gui.steganography.lifting import haar_forward, haar_inverse
+
+
+@pytest.mark.parametrize('shape', [(8, 8), (31, 17), (64, 48), (5, 3)])
+@pytest.mark.parametrize('level', [1, 2])
+def test_haar_lifting_is_lossless(shape, level):
+    channel = np.random.default_rng(0).integers(0, 256, shape).astype(np.uint8)
+    assert np.array_equal(haar_inverse(haar_forward(channel, level)), channel)
+
+
+def _saturated_cover(seed=1, shape=(61, 95, 3)):
+    """Odd-sized cover made mostly of 0 and 255, the worst case for overflow"""
+    values = np.array([0, 0, 1, 128, 254, 255, 255], dtype=np.uint8)
+    return np.random.default_rng(seed).choice(values, size=shape)
+
+
+@pytest.mark.parametrize('level, bands, channels', [
+    (1, ('cH',), (0,)),
+    (2, ('cH', 'cV', 'cD'), (0, 2)),
+    (3, ('cV', 'cD'), (1,)),
+])
+def test_dwt_lifting_round_trip_on_saturated_cover(level, bands, channels):
+    cover = _saturated_cover()
+    engine = DWTSteganography()
+    engine.level, engine.bands, engine.channels = level, bands, channels
+    engine.compression = 'none'
+    size = capacity(cover.shape, 'DWT', {'compression': 'none', 'level': level,
+                                         'bands': bands, 'channels': channels})
+    data = np.random.default_rng(level).bytes(size)
+    stego = engine.encode_bytes(cover, data, PASSWORD)
+    assert engine.decode_bytes(stego, PASSWORD) == data
+
+
+def test_hybrid_lifting_round_trip_on_saturated_cover():
+    cover = _saturated_cover()
+    engine = HybridSteganography()
+    engine.compression = 'none'
+    data = np.random.default_rng(5).bytes(capacity(cover.shape, 'Hybrid', {'compression': 'none'}))
+    stego = engine.encode_bytes(cover, data, PASSWORD)
+    assert engine.decode_bytes(stego, PASSWORD) == data
+    assert np.abs(stego.astype(int) - cover).max() <= 2
+
+
+@pytest.mark.parametrize('engine_class', [DWTSteganography, HybridSteganography])
+def test_lifting_leaves_pixels_without_bits_unchanged(engine_class):
+    cover = _saturated_cover(shape=(96, 128, 3))
+    stego = engine_class().encode_array(cover, 'short', PASSWORD)
+    changed_rows = np.flatnonzero((stego != cover).any(axis=(1, 2)))
+    assert changed_rows.max() < cover.shape[0] // 2
+    assert np.array_equal(stego[:, :, 1:], cover[:, :, 1:])